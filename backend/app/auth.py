@@ -1,18 +1,46 @@
 import os
 from fastapi_login import LoginManager
-from fastapi import HTTPException
+from fastapi import Depends, HTTPException
 from app.models import users_table
 from app.db import database
+from app.services.cache import TTLCache
+from app.services.llm_scheduler import llm_user
 from dotenv import load_dotenv
 
 load_dotenv()
 SECRET = os.getenv("SECRET_KEY")
 
+# Per-process cache of loaded users, so auth does not hit the DB on every request
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+# Comma-separated emails allowed to use the /admin endpoints
+ADMIN_EMAILS = {e.strip() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()}
+
 manager = LoginManager(SECRET, token_url="/auth/login", use_cookie=True)
 manager.cookie_name = "interview_auth"
 
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
 @manager.user_loader()
 async def load_user(email: str):
+    # LLM calls made while serving this request count against this user's rate limit
+    llm_user.set(email)
+    user = user_cache.get(email)
+    if user is not None:
+        return user
+
     query = users_table.select().where(users_table.c.email == email)
-    return await database.fetch_one(query)
+    user = await database.fetch_one(query)
+    if user is not None:
+        user_cache.set(email, user)
+    return user
+
+def invalidate_user(email: str):
+    """Drop a cached user after its row changes."""
+    user_cache.invalidate(email)
 
+def admin_user(user=Depends(manager)):
+    """Dependency for /admin routes: the logged-in user, if listed in ADMIN_EMAILS."""
+    if user.email not in ADMIN_EMAILS:
+        raise HTTPException(status_code=403, detail="Admin access required.")
+    return user
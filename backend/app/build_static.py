@@ -0,0 +1,24 @@
+"""
+Build the frontend for production (see app/services/static_assets.py).
+
+    python -m app.build_static                 # frontend/ -> frontend/dist (or $FRONTEND_DIST)
+    python -m app.build_static --source ../frontend --out /tmp/dist
+
+Run it after changing anything in frontend/; the server picks up the
+build on start. With `brotli` installed (it is in requirements.txt) .br
+files are written too.
+"""
+import argparse
+
+from app.services.static_assets import build_dir, build_static
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fingerprint and precompress the static frontend.")
+    parser.add_argument("--source", default="frontend", help="frontend directory (default ./frontend)")
+    parser.add_argument("--out", help="build directory (default $FRONTEND_DIST, else <source>/dist)")
+    args = parser.parse_args()
+    out = args.out or build_dir(args.source)
+    manifest = build_static(args.source, out)
+    for name, hashed in manifest.items():
+        print(f"  {name} -> {hashed}")
+    print(f"✅ Built {out}.")
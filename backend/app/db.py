@@ -1,10 +1,133 @@
 from sqlalchemy import create_engine, MetaData
-from databases import Database
+from databases import Database, DatabaseURL
+from app.services.metrics import db_query_seconds, record_stage, registry
+import asyncio
 import os
+import time
 
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://postgres:postgres@db:5432/interviews")
+# Optional read replica for read-heavy endpoints (session history, advice); unset = use the primary
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
 
-database = Database(DATABASE_URL)
+# asyncpg pool per worker: DB_POOL_SIZE connections kept open, up to DB_POOL_MAX_OVERFLOW more on demand
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", "10"))
+# Seconds a query may wait for a free connection before the request fails with a 503
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# Prepared statements cached per connection (set 0 behind pgbouncer in transaction mode)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+db_pool_wait_seconds = registry.histogram(
+    "db_pool_wait_seconds", "Time spent waiting for a pooled database connection",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+db_pool_timeouts = registry.counter("db_pool_timeouts_total", "Queries that gave up waiting for a database connection")
+
+
+class PoolTimeout(Exception):
+    """No database connection became free within DB_POOL_TIMEOUT."""
+
+
+def _pool_options(url: str) -> dict:
+    # Only asyncpg understands these; SQLite (local runs, benchmarks) takes no pool options
+    if not DatabaseURL(url).scheme.startswith("postgres"):
+        return {}
+    return {
+        "min_size": DB_POOL_SIZE,
+        "max_size": DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW,
+        "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+    }
+
+
+class _PooledConnection:
+    """Wraps a backend connection to time (and bound) the wait for a pooled connection."""
+
+    def __init__(self, connection, database: "InstrumentedDatabase"):
+        self._connection = connection
+        self._database = database
+
+    async def acquire(self):
+        db = self._database
+        db.waiting += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._connection.acquire(), DB_POOL_TIMEOUT)
+        except asyncio.TimeoutError:
+            db_pool_timeouts.inc(db=db.name)
+            raise PoolTimeout(f"No {db.name} database connection free after {DB_POOL_TIMEOUT}s")
+        finally:
+            db.waiting -= 1
+            elapsed = time.perf_counter() - start
+            db_pool_wait_seconds.observe(elapsed, db=db.name)
+            record_stage("db_pool_wait", elapsed * 1000)
+        db.in_use += 1
+
+    async def release(self):
+        try:
+            await self._connection.release()
+        finally:
+            self._database.in_use -= 1
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+class InstrumentedDatabase(Database):
+    """`databases.Database` that records the latency of every call for /metrics and Server-Timing."""
+
+    def __init__(self, url: str, name: str = "primary", **options):
+        super().__init__(url, **{**_pool_options(url), **options})
+        self.name = name
+        self.max_size = self.options.get("max_size", 0)
+        self.in_use = 0
+        self.waiting = 0
+        connection = self._backend.connection
+        self._backend.connection = lambda: _PooledConnection(connection(), self)
+
+    async def _timed(self, op: str, call):
+        start = time.perf_counter()
+        try:
+            return await call
+        finally:
+            elapsed = time.perf_counter() - start
+            db_query_seconds.observe(elapsed, op=op)
+            record_stage("db", elapsed * 1000)
+
+    async def execute(self, query, values=None):
+        return await self._timed("execute", super().execute(query, values))
+
+    async def execute_many(self, query, values):
+        return await self._timed("execute_many", super().execute_many(query, values))
+
+    async def fetch_one(self, query, values=None):
+        return await self._timed("fetch_one", super().fetch_one(query, values))
+
+    async def fetch_all(self, query, values=None):
+        return await self._timed("fetch_all", super().fetch_all(query, values))
+
+    async def fetch_val(self, query, values=None, column=0):
+        return await self._timed("fetch_val", super().fetch_val(query, values, column))
+
+    def pool_stats(self) -> dict:
+        return {
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "max_size": self.max_size,
+            "utilization": round(self.in_use / self.max_size, 4) if self.max_size else 0.0,
+        }
+
+
+database = InstrumentedDatabase(DATABASE_URL)
+# Reads that tolerate a little replication lag; the primary itself when no replica is configured
+read_database = InstrumentedDatabase(DATABASE_REPLICA_URL, name="replica") if DATABASE_REPLICA_URL else database
 metadata = MetaData()
-engine = create_engine(DATABASE_URL)
 
+_engine = None
+
+
+def get_engine():
+    """Sync engine for migrations and maintenance scripts, created on first use."""
+    global _engine
+    if _engine is None:
+        _engine = create_engine(DATABASE_URL)
+    return _engine
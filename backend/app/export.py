@@ -0,0 +1,53 @@
+"""
+Bulk export of interview history (see app/services/export.py).
+
+    python -m app.export -o history.ndjson.zst --compress zstd     # everyone, every table
+    python -m app.export --format csv --table interactions -o interactions.csv
+    python -m app.export --user a@b.c > a.ndjson
+
+Rows are streamed from the read database, so memory stays flat for any
+history size.
+"""
+import argparse
+import asyncio
+import sys
+
+from app.db import read_database
+from app.services.export import FORMATS, TABLES, export_stream, export_tables
+
+
+async def export(args, tables) -> int:
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    written = 0
+    await read_database.connect()
+    try:
+        async for chunk in export_stream(args.format, tables, args.user, args.compress):
+            out.write(chunk)
+            written += len(chunk)
+    finally:
+        await read_database.disconnect()
+        if args.output:
+            out.close()
+        else:
+            out.flush()
+    if args.output:
+        print(f"✅ Wrote {written} bytes to {args.output}.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export sessions, interactions and skill history.")
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument(
+        "--table", choices=("all",) + TABLES, default="all",
+        help="what to export (all = every table, NDJSON only)"
+    )
+    parser.add_argument("--compress", choices=("zstd",), help="compress the output")
+    parser.add_argument("--user", help="only this user's history")
+    parser.add_argument("-o", "--output", help="file to write (default stdout)")
+    args = parser.parse_args()
+    try:
+        tables = export_tables(args.format, args.table)
+    except ValueError as e:
+        parser.error(str(e))
+    raise SystemExit(asyncio.run(export(args, tables)))
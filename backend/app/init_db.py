@@ -1,10 +1,8 @@
-from app.db import metadata, engine
-from app.models import sessions_table, interactions_table
+from app.migrate import upgrade
 
 def init_db():
-    metadata.create_all(engine)
-    print("✅ Database tables created.")
+    # Kept for old instructions; schema changes now go through app/migrate.py
+    upgrade()
 
 if __name__ == "__main__":
     init_db()
-
@@ -1,110 +1,369 @@
-from fastapi import FastAPI, HTTPException, Query, Depends, Response
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, HTTPException, Header, Query, Depends, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.dialects.postgresql import insert as pg_insert
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import tuple_
 
-from app.models import InterviewRequest, FeedbackRequest, AdviceRequest
+from app.models import InterviewRequest, FeedbackRequest, AdviceRequest, RescoreRequest
 from app.models import (
     interactions_table, 
     sessions_table, 
     users_table, 
-    user_skills_table, 
-    user_skill_history_table
+    session_summaries_table
 )
-from app.auth import manager
-from app.constants import skills
+from app.auth import manager, admin_user, invalidate_user, user_cache
 from app.utils import (
     generate_interview_question,
     generate_session_id,
     log_interaction,
-    generate_feedback,
     create_session,
-    generate_advice,
-    extract_skill_scores
+    stream_interview_question,
+    stream_advice
 )
-from app.db import database
-
+from app.db import database, read_database, PoolTimeout
+from app.services.llm_client import close_client, run_until_disconnect
+from app.services.llm_cache import llm_cache
+from app.services.llm_scheduler import llm_scheduler, LLMError
+from app.services.feedback_pipeline import (
+    run_feedback_pipeline,
+    stream_feedback_pipeline,
+    score_and_save_skills
+)
+from app.services.skill_store import fetch_last_skill_scores, save_skill_scores
+from app.services.skill_progress import fetch_skill_progress
+from app.services.skill_queue import skill_queue
+from app.services.advice_engine import get_advice, prepare_advice, store_advice
+from app.services.idempotency import answer_key, load_response, save_response
+from app.services.pagination import decode_cursor, next_cursor
+from app.services.export import export_response
+from app.services.question_pool import question_pool
+from app.services.rescore import JobConflict, RescoreJob, fetch_job, running_jobs, start_in_background, stop_jobs
+from app.services.question_dedup import question_index
+from app.services.single_flight import single_flight
+from app.services.session_summaries import record_answer, serialize_summary
+from app.services.streaming import sse_event, sse_response
+from app.services.static_assets import StaticAssets
+from app.services.compression import TextGZipMiddleware
+from app.services.warmup import readiness, warm_up
+from app.services.metrics import MetricsMiddleware, registry, ws_message_seconds
+from app.services.passwords import hash_password, verify_password, needs_rehash, shutdown_executor
+
+from contextlib import asynccontextmanager
 from datetime import datetime
-from passlib.hash import bcrypt
 from pydantic import BaseModel
+from typing import Optional
 
+import asyncio
+import json
 import logging
+import math
+import time
 
 logger = logging.getLogger("uvicorn")
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pools and clients are created here rather than at import, so importing the app stays cheap
+    await startup()
+    try:
+        yield
+    finally:
+        await shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
-# Serve HTML from frontend directory
-app.mount("/static", StaticFiles(directory="frontend", html=True), name="frontend")
+FRONTEND_ORIGINS = ["http://localhost:8080"]  # your frontend origin
+# How long a socket waits to push a deferred skill update before leaving it to polling
+WS_SKILL_WAIT = 60
+
+# Serve the frontend: the fingerprinted, precompressed build (frontend/dist or FRONTEND_DIST) if there is one
+app.mount("/static", StaticAssets(directory="frontend", html=True), name="frontend")
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["http://localhost:8080"],  # your frontend origin
+    allow_origins=FRONTEND_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+# Gzip JSON and other text responses (static files arrive precompressed)
+app.add_middleware(TextGZipMiddleware)
+
+# Request/LLM/DB timings for /metrics and the Server-Timing header
+app.add_middleware(MetricsMiddleware)
+registry.gauge("user_cache", "Auth user cache statistics", user_cache.stats)
+registry.gauge("question_pool", "Opening question pool statistics", question_pool.stats)
+registry.gauge("skill_queue", "Deferred skill-scoring queue statistics", skill_queue.stats)
+registry.gauge("llm_cache", "LLM response cache statistics", llm_cache.stats)
+registry.gauge("single_flight", "Coalesced duplicate requests", single_flight.stats)
+registry.gauge("question_index", "Per-user question de-duplication index statistics", question_index.stats)
+registry.gauge("llm_scheduler", "LLM scheduler concurrency and circuit breaker state", llm_scheduler.stats)
+registry.gauge("db_pool", "Primary database connection pool usage", database.pool_stats)
+if read_database is not database:
+    registry.gauge("db_replica_pool", "Read replica connection pool usage", read_database.pool_stats)
+
+@app.exception_handler(LLMError)
+async def llm_error_handler(request: Request, exc: LLMError):
+    # 503 while OpenAI is failing (breaker open / overloaded), 429 for per-user limits, else 502
+    headers = {"Retry-After": str(math.ceil(exc.retry_after))} if exc.retry_after else None
+    return JSONResponse(status_code=exc.status_code, content={"detail": str(exc)}, headers=headers)
+
+@app.exception_handler(PoolTimeout)
+async def pool_timeout_handler(request: Request, exc: PoolTimeout):
+    # The pool is saturated: ask the client to back off rather than queueing indefinitely
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+def _error_payload(e: Exception, context: str) -> dict:
+    if isinstance(e, LLMError):
+        return {"detail": str(e), "status": e.status_code, "retry_after": e.retry_after}
+    return {"detail": f"{context}: {e}"}
+
+def _error_event(e: Exception, context: str) -> str:
+    return sse_event("error", _error_payload(e, context))
+
 @app.get("/")
 def root():
     return {"message": "AI Interview Simulator is running 🚀"}
 
-@app.post("/interview/question")
-async def get_question(req: InterviewRequest, user=Depends(manager)):
-    session_id = req.session_id or generate_session_id()
+@app.get("/healthz")
+def healthz():
+    # Readiness probe: 503 until the DB pools are connected and the startup warm-up is done
+    body = {**readiness.stats(), "db_pool": database.pool_stats()}
+    return JSONResponse(body, status_code=200 if readiness.ready else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return registry.render()
+
+async def _new_session(req: InterviewRequest, user) -> str:
+    session_id = generate_session_id()
+    await create_session(session_id, user.email)
+
+    # Update user profile with the latest role, experience, tech_stack
+    await database.execute(
+        users_table.update()
+        .where(users_table.c.email == user.email)
+        .values(
+            role=req.role,
+            experience=req.experience,
+            tech_stack=req.tech_stack
+        )
+    )
+    invalidate_user(user.email)
+    return session_id
 
-    # Create session if not exists
+async def _start_question(req: InterviewRequest, user) -> tuple[str, str]:
+    """Create the session if needed and return (session_id, last_answer)."""
     if not req.session_id:
-        await create_session(session_id, user.email)
-
-        # Update user profile with the latest role, experience, tech_stack
-        await database.execute(
-            users_table.update()
-            .where(users_table.c.email == user.email)
-            .values(
-                role=req.role,
-                experience=req.experience,
-                tech_stack=req.tech_stack
-            )
-        )
+        return await _new_session(req, user), None
+    session_id = req.session_id
 
     # Get last answer if any
     query = interactions_table.select().where(
         interactions_table.c.session_id == session_id
-    ).order_by(interactions_table.c.timestamp.desc()).limit(1)
+    ).order_by(interactions_table.c.timestamp.desc(), interactions_table.c.id.desc()).limit(1)
 
     last_interaction = await database.fetch_one(query)
     last_answer = last_interaction["answer"] if last_interaction else None
-
-    # Generate question with context
-    question = await generate_interview_question(
-        role=req.role,
-        experience=req.experience,
-        tech_stack=req.tech_stack,
-        difficulty=req.difficulty,
-        last_answer=last_answer
+    return session_id, last_answer
+
+async def _log_question(session_id: str, user_email: str, question: str) -> int:
+    interaction_id = await log_interaction(session_id, question)
+    question_index.add(user_email, question)
+    return interaction_id
+
+async def _take_pooled(req: InterviewRequest, user) -> Optional[str]:
+    await question_index.load(user.email)
+    return question_pool.take(
+        user.email, req.role, req.experience, req.tech_stack, req.difficulty,
+        reject=lambda question: question_index.is_duplicate(user.email, question)
     )
 
-    await log_interaction(session_id, question)
+def _question_flight(req: InterviewRequest, user, idempotency_key: Optional[str]) -> Optional[str]:
+    # Duplicate follow-up requests for a session coalesce even without an idempotency key
+    if idempotency_key:
+        return f"question:{user.email}:{idempotency_key}"
+    if req.session_id:
+        return f"question:{user.email}:{req.session_id}:{req.role}:{req.experience}:{req.tech_stack}:{req.difficulty}"
+    return None
+
+async def _coalesced_events(flight: Optional[str], events, outcome: dict, replay):
+    """
+    Stream `events()` as the leader of `flight`, or, if an identical request
+    is already streaming, wait for its body (set in `outcome["body"]`) and
+    send `replay(body)` instead.
+    """
+    if flight is None:
+        async for event in events():
+            yield event
+        return
+
+    future, leader = single_flight.join(flight)
+    if not leader:
+        try:
+            body = await asyncio.shield(future)
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+            return
+        for event in replay(body):
+            yield event
+        return
+
+    try:
+        async for event in events():
+            yield event
+    finally:
+        if "body" in outcome:
+            single_flight.finish(flight, result=outcome["body"])
+        else:
+            single_flight.finish(flight, error=RuntimeError("The original request did not complete"))
+
+def _replay_question(body: dict):
+    yield sse_event("session", {"session_id": body["session_id"]})
+    yield sse_event("token", {"text": body["question"]})
+    yield sse_event("done", body)
 
-    return {"question": question, "session_id": session_id}
+@app.post("/interview/question")
+async def get_question(
+    req: InterviewRequest,
+    request: Request,
+    response: Response,
+    user=Depends(manager),
+    idempotency_key: Optional[str] = Header(None)
+):
+    stored = await load_response(user.email, "question", [idempotency_key])
+    if stored:
+        response.headers["Idempotent-Replayed"] = "true"
+        return stored
+
+    async def ask() -> dict:
+        session_id, last_answer = await _start_question(req, user)
+
+        # Opening questions come from the pre-generated pool when possible
+        question = None
+        if last_answer is None:
+            question = await _take_pooled(req, user)
+
+        # Generate question with context, regenerating near-duplicates of the user's past questions
+        if question is None:
+            question = await question_index.generate_distinct(
+                user.email,
+                lambda avoid: generate_interview_question(
+                    role=req.role,
+                    experience=req.experience,
+                    tech_stack=req.tech_stack,
+                    difficulty=req.difficulty,
+                    last_answer=last_answer,
+                    avoid=avoid
+                )
+            )
+
+        await _log_question(session_id, user.email, question)
+        body = {"question": question, "session_id": session_id}
+        await save_response(user.email, "question", [idempotency_key], body)
+        return body
+
+    flight = _question_flight(req, user, idempotency_key)
+    return await run_until_disconnect(request, single_flight.do(flight, ask) if flight else ask())
+
+async def _question_stream(req: InterviewRequest, user, last_answer: Optional[str]):
+    """
+    Produce the next question: yields ("token", text) and ("reset", reason)
+    while generating, then ("question", question) once it is complete.
+    """
+    pooled = None
+    if last_answer is None:
+        pooled = await _take_pooled(req, user)
+    else:
+        await question_index.load(user.email)
+
+    if pooled is not None:
+        yield "token", pooled
+        yield "question", pooled
+        return
+
+    rejected = []
+    while True:
+        parts = []
+        async for delta in stream_interview_question(
+            role=req.role,
+            experience=req.experience,
+            tech_stack=req.tech_stack,
+            difficulty=req.difficulty,
+            last_answer=last_answer,
+            avoid=rejected
+        ):
+            parts.append(delta)
+            yield "token", delta
+
+        question = "".join(parts).strip()
+        if not question_index.should_regenerate(user.email, question, rejected):
+            break
+        # Near-duplicate of an earlier question: tell the client to discard it and stream another
+        yield "reset", "duplicate"
+    yield "question", question
+
+@app.post("/interview/question/stream")
+async def stream_question(
+    req: InterviewRequest,
+    user=Depends(manager),
+    idempotency_key: Optional[str] = Header(None)
+):
+    stored = await load_response(user.email, "question", [idempotency_key])
+    if stored:
+        return sse_response(_aiter(_replay_question(stored)))
+
+    # Once streaming starts the status is 200, so refuse up front while the LLM is unavailable
+    llm_scheduler.check()
+    outcome = {}
+
+    async def events():
+        session_id, last_answer = await _start_question(req, user)
+        yield sse_event("session", {"session_id": session_id})
+
+        try:
+            async for kind, payload in _question_stream(req, user, last_answer):
+                if kind == "token":
+                    yield sse_event("token", {"text": payload})
+                elif kind == "reset":
+                    yield sse_event("reset", {"reason": payload})
+                else:
+                    question = payload
+        except Exception as e:
+            yield _error_event(e, "Error generating question")
+            return
+
+        # Persist only once the whole question exists
+        await _log_question(session_id, user.email, question)
+        outcome["body"] = {"question": question, "session_id": session_id}
+        await save_response(user.email, "question", [idempotency_key], outcome["body"])
+        yield sse_event("done", outcome["body"])
+
+    flight = _question_flight(req, user, idempotency_key)
+    return sse_response(_coalesced_events(flight, events, outcome, _replay_question))
 
 @app.get("/session/{session_id}")
 async def get_session_log_route(
     session_id: str,
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
     limit: int = Query(20, ge=1, le=100),
     user=Depends(manager)
 ):
+    # Keyset pagination on (timestamp, id): deep pages cost the same as the first.
+    # History reads go to the read replica when one is configured.
     query = (
         interactions_table
         .select()
         .where(interactions_table.c.session_id == session_id)
-        .order_by(interactions_table.c.timestamp.asc())
-        .offset(skip)
-        .limit(limit)
+        .order_by(interactions_table.c.timestamp.asc(), interactions_table.c.id.asc())
+        .limit(limit + 1)
     )
-    records = await database.fetch_all(query)
+    position = decode_cursor(cursor)
+    if position:
+        query = query.where(
+            tuple_(interactions_table.c.timestamp, interactions_table.c.id) > tuple_(*position)
+        )
+    records, cursor_next = next_cursor(await read_database.fetch_all(query), limit, "timestamp")
 
     interactions = [
         {
@@ -121,93 +380,363 @@ async def get_session_log_route(
         "session_id": session_id,
         "interactions": interactions,
         "pagination": {
-            "skip": skip,
             "limit": limit,
-            "count": len(interactions)
+            "count": len(interactions),
+            "next_cursor": cursor_next
         }
     }
 
-@app.post("/interview/feedback")
-async def give_feedback(req: FeedbackRequest, user=Depends(manager)):
+async def _last_interaction(session_id: str):
     # Fetch last interaction for session
     query = interactions_table.select().where(
-        interactions_table.c.session_id == req.session_id
-    ).order_by(interactions_table.c.timestamp.desc()).limit(1)
-    
+        interactions_table.c.session_id == session_id
+    ).order_by(interactions_table.c.timestamp.desc(), interactions_table.c.id.desc()).limit(1)
+
     last_interaction = await database.fetch_one(query)
-    
+
     if not last_interaction:
         raise HTTPException(status_code=404, detail="No questions found for session")
+    return last_interaction
 
-    # Generate feedback and score
-    feedback, score = generate_feedback(last_interaction.question, req.answer)
+async def _save_feedback(req: FeedbackRequest, user, last_interaction, result: dict) -> dict:
+    """Persist the answer, feedback and skill scores, and build the response body."""
+    feedback, score = result["feedback"], result["score"]
 
-    # Update the last interaction with answer, feedback, score
+    # Update the last interaction with answer, feedback, score (and the session's counters)
+    now = datetime.utcnow()
     update_query = interactions_table.update().where(
-        interactions_table.c.id == last_interaction.id
+        interactions_table.c.id == last_interaction["id"]
     ).values(
         answer=req.answer,
         feedback=feedback,
-        score=score
+        score=score,
+        answered_at=now
     )
-    await database.execute(update_query)
+    async with database.transaction():
+        await database.execute(update_query)
+        await record_answer(req.session_id, last_interaction, score, now)
+
+    if not req.defer_skills:
+        skills_status = "done" if result["skills"] is not None else "failed"
+        if result["skills"]:
+            await save_skill_scores(user.email, result["skills"])
+    elif skill_queue.submit(last_interaction["id"], user.email, req.answer):
+        skills_status = "pending"
+    else:
+        # Queue is full, fall back to scoring inline
+        try:
+            result["skills"] = await score_and_save_skills(user.email, req.answer)
+            skills_status = "done"
+        except Exception as e:
+            logger.warning("Inline skill scoring failed: %r", e)
+            skills_status = "failed"
 
-    # Fetch previous skill scores for this user
-    # Assuming you have user email available (e.g. via token)
-    prev_scores_query = user_skills_table.select().where(
-        user_skills_table.c.user_email == user.email
-    )
-    rows = await database.fetch_all(prev_scores_query)
-    last_skill_scores = {row['skill_name']: row['score'] for row in rows} if rows else {}
-    # Initialize missing skills with 0
-    for skill in skills:
-        last_skill_scores.setdefault(skill, 0.0)
+    return {
+        "interaction_id": last_interaction["id"],
+        "feedback": feedback,
+        "score": score,
+        "skills": result["skills"],
+        "skills_status": skills_status,
+        "timings": result["timings"]
+    }
 
-    # Extract updated skill scores
-    updated_skill_scores = await extract_skill_scores(req.answer, last_skill_scores)
+def _replay_feedback(body: dict):
+    yield sse_event("token", {"text": body["feedback"]})
+    yield sse_event("done", body)
 
-    # Upsert updated skill scores into DB
-    for skill, new_score in updated_skill_scores.items():
-        now = datetime.utcnow()
+async def _aiter(events):
+    for event in events:
+        yield event
 
-        # 1. Insert into history
-        await database.execute(
-            user_skill_history_table.insert().values(
-                user_email=user.email,
-                skill_name=skill,
-                score=new_score,
-                timestamp=now
-            )
+@app.post("/interview/feedback")
+async def give_feedback(
+    req: FeedbackRequest,
+    request: Request,
+    response: Response,
+    user=Depends(manager),
+    idempotency_key: Optional[str] = Header(None)
+):
+    last_interaction = await _last_interaction(req.session_id)
+
+    # Retries of an answer that was already graded get the stored result
+    answer = answer_key(req.session_id, last_interaction.id, req.answer)
+    stored = await load_response(user.email, "feedback", [idempotency_key, answer])
+    if stored:
+        response.headers["Idempotent-Replayed"] = "true"
+        return stored
+
+    async def grade() -> dict:
+        # Grade the answer and extract skill scores in parallel
+        # (skill scoring is left to the background queue when deferred)
+        result = await run_feedback_pipeline(
+            last_interaction.question, req.answer, user.email,
+            include_skills=not req.defer_skills
         )
+        body = await _save_feedback(req, user, last_interaction, result)
+        await save_response(user.email, "feedback", [answer, idempotency_key], body)
+        return body
+
+    # Concurrent duplicates (double-clicks, retries) share one grading
+    return await run_until_disconnect(request, single_flight.do(f"feedback:{user.email}:{answer}", grade))
+
+@app.post("/interview/feedback/stream")
+async def stream_feedback_route(
+    req: FeedbackRequest,
+    user=Depends(manager),
+    idempotency_key: Optional[str] = Header(None)
+):
+    last_interaction = await _last_interaction(req.session_id)
+
+    answer = answer_key(req.session_id, last_interaction.id, req.answer)
+    stored = await load_response(user.email, "feedback", [idempotency_key, answer])
+    if stored:
+        return sse_response(_aiter(_replay_feedback(stored)))
+
+    llm_scheduler.check()
+    outcome = {}
+
+    async def events():
+        try:
+            async for kind, payload in stream_feedback_pipeline(
+                last_interaction.question, req.answer, user.email,
+                include_skills=not req.defer_skills
+            ):
+                if kind == "token":
+                    yield sse_event("token", {"text": payload})
+                else:
+                    result = payload
+        except Exception as e:
+            yield _error_event(e, "Feedback error")
+            return
+
+        outcome["body"] = await _save_feedback(req, user, last_interaction, result)
+        await save_response(user.email, "feedback", [answer, idempotency_key], outcome["body"])
+        yield sse_event("done", outcome["body"])
+
+    flight = f"feedback:{user.email}:{answer}"
+    return sse_response(_coalesced_events(flight, events, outcome, _replay_feedback))
+
+@app.get("/interview/feedback/{interaction_id}/skills")
+async def get_skill_update(interaction_id: int, user=Depends(manager)):
+    job = skill_queue.get(interaction_id)
+    if not job or job["user_email"] != user.email:
+        raise HTTPException(status_code=404, detail="No skill update found for this interaction")
 
-        # 2. Upsert current skill snapshot
-        stmt = pg_insert(user_skills_table).values(
-            user_email=user.email,
-            skill_name=skill,
-            score=new_score,
-            updated_at=now
-        ).on_conflict_do_update(
-            index_elements=["user_email", "skill_name"],
-            set_={
-                "score": new_score,
-                "updated_at": now
-            }
-        )
-        await database.execute(stmt)
+    return {
+        "interaction_id": interaction_id,
+        "status": job["status"],
+        "skills": job["skills"]
+    }
+
+async def _socket_user(websocket: WebSocket):
+    # Cookie auth means a cross-site page could open the socket; browsers always send Origin
+    origin = websocket.headers.get("origin")
+    if origin and origin not in FRONTEND_ORIGINS and origin.split("://", 1)[-1] != websocket.headers.get("host"):
+        return None
+    token = websocket.cookies.get(manager.cookie_name)
+    if not token:
+        return None
+    try:
+        return await manager.get_current_user(token)
+    except Exception:
+        return None
+
+async def _resume_session(session_id: str, user) -> Optional[dict]:
+    """The last interaction of one of the user's sessions (None if it has none yet)."""
+    session = await database.fetch_one(sessions_table.select().where(sessions_table.c.id == session_id))
+    if session is None or session["user_email"] != user.email:
+        raise HTTPException(status_code=404, detail="Session not found")
+    last = await database.fetch_one(
+        interactions_table.select()
+        .where(interactions_table.c.session_id == session_id)
+        .order_by(interactions_table.c.timestamp.desc(), interactions_table.c.id.desc())
+        .limit(1)
+    )
+    return dict(last) if last else None
 
+def _interaction_payload(interaction: Optional[dict]) -> Optional[dict]:
+    if interaction is None:
+        return None
     return {
-        "feedback": feedback,
-        "score": score,
-        "skills": updated_skill_scores
+        "interaction_id": interaction["id"],
+        "question": interaction["question"],
+        "answer": interaction["answer"],
+        "feedback": interaction["feedback"],
+        "score": interaction["score"],
     }
 
-@app.on_event("startup")
+def _remember_skills(state: dict, skills: Optional[dict]):
+    if skills and state["skills"] is not None:
+        state["skills"].update(skills)
+
+async def _socket_question(state: dict, user, send):
+    req, last = state["req"], state["last"]
+    async for kind, payload in _question_stream(req, user, last["answer"] if last else None):
+        if kind == "token":
+            await send("token", {"stage": "question", "text": payload})
+        elif kind == "reset":
+            await send("reset", {"reason": payload})
+        else:
+            question = payload
+
+    interaction_id = await _log_question(req.session_id, user.email, question)
+    state["last"] = {"id": interaction_id, "question": question, "answer": None, "feedback": None, "score": None}
+    await send("question", {"session_id": req.session_id, "interaction_id": interaction_id, "question": question})
+
+async def _push_skills(interaction_id: int, state: dict, send):
+    result = await skill_queue.wait(interaction_id, WS_SKILL_WAIT) or {"status": "failed", "skills": None}
+    if result["status"] == "done":
+        _remember_skills(state, result["skills"])
+    try:
+        await send("skills", {"interaction_id": interaction_id, "status": result["status"], "skills": result["skills"]})
+    except WebSocketDisconnect:
+        pass
+
+async def _socket_answer(message: dict, state: dict, user, send, tasks: set):
+    last = state["last"]
+    if last is None:
+        raise HTTPException(status_code=404, detail="No questions found for session")
+    req = FeedbackRequest(
+        session_id=state["req"].session_id,
+        answer=message.get("answer"),
+        defer_skills=bool(message.get("defer_skills"))
+    )
+
+    include_skills = not req.defer_skills
+    if include_skills and state["skills"] is None:
+        state["skills"] = await fetch_last_skill_scores(user.email)
+    async for kind, payload in stream_feedback_pipeline(
+        last["question"], req.answer, user.email,
+        include_skills=include_skills,
+        last_skill_scores=state["skills"]
+    ):
+        if kind == "token":
+            await send("token", {"stage": "feedback", "text": payload})
+        else:
+            result = payload
+
+    body = await _save_feedback(req, user, last, result)
+    last.update(answer=req.answer, feedback=body["feedback"], score=body["score"])
+    await send("feedback", body)
+
+    if body["skills_status"] == "pending":
+        # Pushed when the background job finishes instead of being polled for
+        task = asyncio.ensure_future(_push_skills(body["interaction_id"], state, send))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    else:
+        _remember_skills(state, body["skills"])
+        await send("skills", {
+            "interaction_id": body["interaction_id"],
+            "status": body["skills_status"],
+            "skills": body["skills"]
+        })
+
+async def _socket_message(message: dict, state: dict, user, send, tasks: set):
+    kind = message.get("type")
+    if kind == "start":
+        req = InterviewRequest.model_validate(message)
+        if req.session_id:
+            # Reconnect: pick the session up where it was, the client decides what to show or resend
+            state.update(req=req, last=await _resume_session(req.session_id, user))
+            await send("session", {
+                "session_id": req.session_id,
+                "resumed": True,
+                "last": _interaction_payload(state["last"])
+            })
+            return
+        req.session_id = await _new_session(req, user)
+        state.update(req=req, last=None)
+        await send("session", {"session_id": req.session_id, "resumed": False})
+        await _socket_question(state, user, send)
+        return
+
+    if state["req"] is None:
+        raise HTTPException(status_code=409, detail="Send a start message first")
+    if kind == "answer":
+        await _socket_answer(message, state, user, send, tasks)
+        if message.get("next"):
+            await _socket_question(state, user, send)
+    elif kind == "next":
+        if message.get("difficulty"):
+            state["req"].difficulty = message["difficulty"]
+        await _socket_question(state, user, send)
+    else:
+        raise HTTPException(status_code=400, detail=f"Unknown message type: {kind}")
+
+@app.websocket("/ws/interview")
+async def interview_socket(websocket: WebSocket):
+    """
+    A whole interview over one connection. It authenticates once and keeps
+    the session's last interaction and the user's skill scores in memory, so
+    a turn skips the auth and "last interaction" queries of the HTTP routes.
+
+    Client messages (JSON):
+      {"type": "start", role, experience, tech_stack, difficulty}  new session, streams its first question
+      {"type": "start", ..., "session_id"}                         resume a session after reconnecting
+      {"type": "answer", "answer", "defer_skills"?, "next"?}       grade an answer (then ask the next question)
+      {"type": "next", "difficulty"?}                              ask the next question
+    Server events: session, token (stage question|feedback), reset, question,
+    feedback, skills, error. Turns are handled one at a time.
+    """
+    user = await _socket_user(websocket)
+    if user is None:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+
+    lock = asyncio.Lock()
+
+    async def send(event: str, payload: dict):
+        async with lock:
+            await websocket.send_json({"type": event, **payload})
+
+    # Skill scores are cached for the connection; only this socket's answers update them
+    state = {"req": None, "last": None, "skills": None}
+    tasks: set[asyncio.Task] = set()
+    try:
+        while True:
+            text = await websocket.receive_text()
+            start = time.perf_counter()
+            kind = "invalid"
+            try:
+                message = json.loads(text)
+                if message.get("type") in ("start", "answer", "next"):
+                    kind = message["type"]
+                await _socket_message(message, state, user, send, tasks)
+            except WebSocketDisconnect:
+                raise
+            except HTTPException as e:
+                await send("error", {"detail": e.detail, "status": e.status_code})
+            except Exception as e:
+                await send("error", _error_payload(e, "Interview error"))
+            finally:
+                ws_message_seconds.observe(time.perf_counter() - start, type=kind)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+
 async def startup():
+    readiness.expect("database", "imports", "llm_client")
     await database.connect()
+    if read_database is not database:
+        await read_database.connect()
+    readiness.done("database")
+    skill_queue.start()
+    asyncio.create_task(warm_up())
+    asyncio.create_task(question_pool.warm_from_profiles())
 
-@app.on_event("shutdown")
 async def shutdown():
+    await stop_jobs()
+    await skill_queue.stop()
+    await question_pool.stop()
     await database.disconnect()
+    if read_database is not database:
+        await read_database.disconnect()
+    await close_client()
+    shutdown_executor()
 
 class UserIn(BaseModel):
     email: str
@@ -219,8 +748,9 @@ async def register(user: UserIn):
     if await database.fetch_one(query):
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_pw = bcrypt.hash(user.password)
+    hashed_pw = await hash_password(user.password)
     await database.execute(users_table.insert().values(email=user.email, password=hashed_pw))
+    invalidate_user(user.email)
     return {"msg": "User registered"}
 
 @app.post("/auth/login")
@@ -228,9 +758,18 @@ async def login(response: Response, user: UserIn):
     query = users_table.select().where(users_table.c.email == user.email)
     db_user = await database.fetch_one(query)
     
-    if not db_user or not bcrypt.verify(user.password, db_user["password"]):
+    if not db_user or not await verify_password(user.password, db_user["password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    # Upgrade hashes created with a lower work factor
+    if needs_rehash(db_user["password"]):
+        await database.execute(
+            users_table.update()
+            .where(users_table.c.email == user.email)
+            .values(password=await hash_password(user.password))
+        )
+        invalidate_user(user.email)
+
     token = manager.create_access_token(data={"sub": user.email})
     manager.set_cookie(response, token)
 
@@ -256,40 +795,134 @@ def get_current_user(user=Depends(manager)):
     return {"email": user.email}
 
 @app.get("/user/session")
-async def get_session_history(user=Depends(manager)):
-    query = sessions_table.select().where(sessions_table.c.user_email == user.email)
-    sessions = await database.fetch_all(query)
-    
-    result = []
-    for s in sessions:
-        result.append({
-            "id": s["id"],
-            "user_email": s["user_email"],
-            "created_at": s["created_at"].isoformat() if s["created_at"] else None  # include timestamp
-        })
-    return {"sessions": result}
+async def get_session_history(
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    user=Depends(manager)
+):
+    # Newest sessions first with their counters, keyset pagination on (created_at, session_id)
+    query = (
+        session_summaries_table.select()
+        .where(session_summaries_table.c.user_email == user.email)
+        .order_by(session_summaries_table.c.created_at.desc(), session_summaries_table.c.session_id.desc())
+        .limit(limit + 1)
+    )
+    position = decode_cursor(cursor)
+    if position:
+        query = query.where(
+            tuple_(session_summaries_table.c.created_at, session_summaries_table.c.session_id) < tuple_(*position)
+        )
+    rows = await read_database.fetch_all(query)
+    sessions, cursor_next = next_cursor(rows, limit, "created_at", "session_id")
+
+    return {"sessions": [serialize_summary(s) for s in sessions], "next_cursor": cursor_next}
+
+@app.get("/user/export")
+def export_history(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    table: str = Query("all", pattern="^(all|sessions|interactions|skill_history)$"),
+    compress: Optional[str] = Query(None, pattern="^zstd$"),
+    user=Depends(manager)
+):
+    # Streamed from a DB cursor; `all` (NDJSON only) tags each line with its table
+    return export_response(format, table, compress, user_email=user.email)
+
+@app.get("/user/skills/progress")
+async def get_skill_progress(
+    bucket: str = Query("day", pattern="^(day|week)$"),
+    points: Optional[int] = Query(None, ge=3, le=1000),
+    since: Optional[datetime] = Query(None),
+    user=Depends(manager)
+):
+    # Served from the day/week rollups; `points` downsamples each series with LTTB
+    skills = await fetch_skill_progress(user.email, bucket, points, since)
+    return {"bucket": bucket, "points": points, "skills": skills}
+
+@app.get("/admin/export")
+def export_all(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    table: str = Query("all", pattern="^(all|sessions|interactions|skill_history)$"),
+    compress: Optional[str] = Query(None, pattern="^zstd$"),
+    user_email: Optional[str] = Query(None),
+    admin=Depends(admin_user)
+):
+    # Every user's history (or one user's); `python -m app.export` writes the same to a file
+    return export_response(format, table, compress, user_email=user_email)
+
+@app.post("/admin/rescore", status_code=202)
+async def start_rescore(req: RescoreRequest, admin=Depends(admin_user)):
+    # Runs in this worker's background; the same name resumes from its checkpoint
+    options = req.model_dump(exclude={"scope", "name", "restart"}, exclude_none=True)
+    job = RescoreJob(req.scope, name=req.name, **options)
+    try:
+        await job.claim(restart=req.restart)
+    except JobConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    start_in_background(job)
+    return job.progress()
+
+@app.get("/admin/rescore/{name}")
+async def get_rescore(name: str, admin=Depends(admin_user)):
+    # Live numbers when the job runs in this worker; otherwise the last checkpoint
+    job = running_jobs.get(name)
+    stored = await fetch_job(name)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="No such job.")
+    return {"stored": stored, "run": job.progress() if job else None}
+
+@app.post("/admin/rescore/{name}/stop")
+def stop_rescore(name: str, admin=Depends(admin_user)):
+    job = running_jobs.get(name)
+    if job is None or job.status != "running":
+        raise HTTPException(status_code=404, detail="Job is not running in this worker.")
+    job.stop("stopped by admin")
+    return job.progress()
 
 @app.post("/interview/advice")
-async def give_advice(user=Depends(manager)):
-    # Fetch all session IDs for this user
-    session_query = sessions_table.select().where(sessions_table.c.user_email == user.email)
-    sessions = await database.fetch_all(session_query)
-    session_ids = [s["id"] for s in sessions]
-
-    if not session_ids:
-        raise HTTPException(status_code=404, detail="No sessions found for this user.")
-
-    # Fetch all interactions tied to those sessions
-    interaction_query = interactions_table.select().where(
-        interactions_table.c.session_id.in_(session_ids)
-    ).order_by(interactions_table.c.timestamp.asc())
-    interactions = await database.fetch_all(interaction_query)
-
-    if not interactions:
+async def give_advice(request: Request, user=Depends(manager)):
+    # Advice comes from a stored rolling summary; only new answers are sent to the model
+    try:
+        advice = await run_until_disconnect(request, get_advice(user.email))
+    except (HTTPException, LLMError):
+        raise
+    except Exception as e:
+        return {"advice": f"Error generating advice: {e}"}
+
+    if advice is None:
         raise HTTPException(status_code=404, detail="No interactions found.")
 
-    # Use the utility function
-    advice = await generate_advice(interactions)
-
     return {"advice": advice}
 
+@app.post("/interview/advice/stream")
+async def stream_advice_route(user=Depends(manager)):
+    llm_scheduler.check()
+    try:
+        state = await prepare_advice(user.email)
+    except LLMError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Error generating advice: {e}")
+    if state is None:
+        raise HTTPException(status_code=404, detail="No interactions found.")
+
+    async def events():
+        # Unchanged history: replay the stored advice in one event
+        if state["advice"]:
+            yield sse_event("token", {"text": state["advice"]})
+            yield sse_event("done", {"advice": state["advice"]})
+            return
+
+        parts = []
+        try:
+            async for delta in stream_advice(state["summary"]):
+                parts.append(delta)
+                yield sse_event("token", {"text": delta})
+        except Exception as e:
+            yield _error_event(e, "Error generating advice")
+            return
+
+        advice = "".join(parts).strip()
+        await store_advice(user.email, state, advice)
+        yield sse_event("done", {"advice": advice})
+
+    return sse_response(events())
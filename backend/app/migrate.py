@@ -0,0 +1,191 @@
+"""
+Versioned schema migrations (replaces the one-shot init_db.py).
+
+    python -m app.migrate            # apply pending migrations
+    python -m app.migrate --status   # show applied / pending migrations
+    python -m app.migrate --backfill-session-summaries   # recompute session_summaries
+
+Each migration runs in its own transaction and is recorded in
+`schema_migrations`, so running the command again is a no-op.
+To change the schema, update app/models.py and append a migration below.
+"""
+import argparse
+from datetime import datetime, timezone
+
+from sqlalchemy import Table, Column, Integer, String, DateTime, MetaData, inspect, select, text
+
+from app.db import metadata, get_engine
+from app.models import (
+    users_table,
+    sessions_table,
+    interactions_table,
+    user_skills_table,
+    user_skill_history_table,
+    advice_summaries_table,
+    session_summaries_table,
+    user_skill_rollups_table,
+    llm_cache_table,
+    idempotency_keys_table,
+    batch_jobs_table
+)
+from app.services.session_summaries import rebuild_session_summaries
+from app.services.skill_progress import rebuild_skill_rollups
+
+migrations_metadata = MetaData()
+
+schema_migrations_table = Table(
+    "schema_migrations",
+    migrations_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String),
+    Column("applied_at", DateTime(timezone=True)),
+)
+
+
+def _create_indexes(conn, *tables):
+    for table in tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def _initial_schema(conn):
+    metadata.create_all(conn, tables=[
+        users_table,
+        sessions_table,
+        interactions_table,
+        user_skills_table,
+        user_skill_history_table
+    ])
+
+
+def _add_column(conn, column):
+    """Add a column declared in app/models.py to its existing table, unless it is already there."""
+    table = column.table.name
+    if column.name in {c["name"] for c in inspect(conn).get_columns(table)}:
+        return
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column.name} {column.type.compile(dialect=conn.dialect)}"))
+
+
+def _hot_path_indexes(conn):
+    # interactions(session_id, timestamp, ...), sessions(user_email, created_at, ...),
+    # user_skill_history(user_email, skill_name, timestamp)
+    _create_indexes(conn, interactions_table, sessions_table, user_skill_history_table)
+
+
+def _advice_summaries(conn):
+    advice_summaries_table.create(conn, checkfirst=True)
+
+
+def _keyset_indexes(conn):
+    # Extend the session/interaction indexes with id for (timestamp, id) cursors
+    _create_indexes(conn, interactions_table, sessions_table)
+    conn.execute(text("DROP INDEX IF EXISTS ix_interactions_session_id_timestamp"))
+    conn.execute(text("DROP INDEX IF EXISTS ix_sessions_user_email_created_at"))
+
+
+def _session_summaries(conn):
+    session_summaries_table.create(conn, checkfirst=True)
+    _create_indexes(conn, session_summaries_table)
+    rebuild_session_summaries(conn)
+
+
+def _skill_rollups(conn):
+    user_skill_rollups_table.create(conn, checkfirst=True)
+    rebuild_skill_rollups(conn)
+
+
+def _llm_cache(conn):
+    llm_cache_table.create(conn, checkfirst=True)
+
+
+def _idempotency_keys(conn):
+    idempotency_keys_table.create(conn, checkfirst=True)
+
+
+def _batch_jobs(conn):
+    batch_jobs_table.create(conn, checkfirst=True)
+
+
+def _answered_at(conn):
+    # Advice summaries fold answers in the order they were saved, not by interaction id.
+    # Existing answers are dated by their question (the closest record there is).
+    _add_column(conn, interactions_table.c.answered_at)
+    conn.execute(text("UPDATE interactions SET answered_at = timestamp WHERE answer IS NOT NULL AND answered_at IS NULL"))
+    _add_column(conn, advice_summaries_table.c.summarized_answered_at)
+    conn.execute(text(
+        "UPDATE advice_summaries SET summarized_answered_at = ("
+        "SELECT answered_at FROM interactions WHERE interactions.id = advice_summaries.summarized_interaction_id"
+        ") WHERE summarized_answered_at IS NULL"
+    ))
+
+
+def _batch_job_failed_keys(conn):
+    _add_column(conn, batch_jobs_table.c.failed_keys)
+
+
+MIGRATIONS = [
+    (1, "initial schema", _initial_schema),
+    (2, "hot-path indexes", _hot_path_indexes),
+    (3, "advice summaries", _advice_summaries),
+    (4, "keyset pagination indexes", _keyset_indexes),
+    (5, "session summaries", _session_summaries),
+    (6, "skill progress rollups", _skill_rollups),
+    (7, "LLM response cache", _llm_cache),
+    (8, "idempotency keys", _idempotency_keys),
+    (9, "batch jobs", _batch_jobs),
+    (10, "interaction answered_at", _answered_at),
+    (11, "batch job failed keys", _batch_job_failed_keys),
+]
+
+
+def applied_versions(conn) -> set[int]:
+    migrations_metadata.create_all(conn)
+    return set(conn.execute(select(schema_migrations_table.c.version)).scalars())
+
+
+def upgrade():
+    with get_engine().begin() as conn:
+        done = applied_versions(conn)
+
+    for version, name, migration in MIGRATIONS:
+        if version in done:
+            continue
+        with get_engine().begin() as conn:
+            migration(conn)
+            conn.execute(schema_migrations_table.insert().values(
+                version=version,
+                name=name,
+                applied_at=datetime.now(timezone.utc)
+            ))
+        print(f"✅ Applied migration {version}: {name}")
+
+    print("✅ Database schema is up to date.")
+
+
+def status():
+    with get_engine().begin() as conn:
+        done = applied_versions(conn)
+    for version, name, _ in MIGRATIONS:
+        print(f"{'applied' if version in done else 'pending':<8} {version:>3}  {name}")
+
+
+def backfill_session_summaries():
+    with get_engine().begin() as conn:
+        count = rebuild_session_summaries(conn)
+    print(f"✅ Rebuilt summaries for {count} sessions.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply database schema migrations.")
+    parser.add_argument("--status", action="store_true", help="list migrations without applying them")
+    parser.add_argument(
+        "--backfill-session-summaries", action="store_true",
+        help="recompute session_summaries from sessions and interactions"
+    )
+    args = parser.parse_args()
+    if args.status:
+        status()
+    elif args.backfill_session_summaries:
+        backfill_session_summaries()
+    else:
+        upgrade()
@@ -1,7 +1,7 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 from datetime import datetime
-from sqlalchemy import Table, Column, Integer, String, DateTime, ForeignKey, Text, UniqueConstraint, Float
+from sqlalchemy import Table, Column, Integer, String, DateTime, ForeignKey, Text, UniqueConstraint, Float, Index
 from sqlalchemy.sql import func
 from app.db import metadata
 
@@ -26,10 +26,22 @@ class SessionData(BaseModel):
 class FeedbackRequest(BaseModel):
     session_id: str
     answer: str
+    defer_skills: bool = False  # score skills in the background, poll for the result
 
 class AdviceRequest(BaseModel):
     session_id: str
 
+class RescoreRequest(BaseModel):
+    scope: Literal["feedback", "skills"]
+    name: Optional[str] = None  # defaults to rescore-<scope>; reusing a name resumes that job
+    # Omitted options use the RESCORE_* defaults
+    concurrency: Optional[int] = Field(None, gt=0, le=64)
+    qps: Optional[float] = Field(None, gt=0, le=100)
+    max_tokens: Optional[int] = Field(None, gt=0)
+    batch_size: Optional[int] = Field(None, gt=0, le=1000)
+    user_email: Optional[str] = None  # only this user's answers
+    restart: bool = False  # ignore the checkpoint of an earlier run
+
 sessions_table = Table(
     "sessions",
     metadata,
@@ -47,7 +59,23 @@ interactions_table = Table(
     Column("answer", Text),
     Column("feedback", Text),
     Column("score", Integer),
-    Column("timestamp", DateTime(timezone=True), default=lambda: datetime.now(ZoneInfo("Asia/Tokyo")))
+    Column("timestamp", DateTime(timezone=True), default=lambda: datetime.now(ZoneInfo("Asia/Tokyo"))),
+    Column("answered_at", DateTime(timezone=True), nullable=True)  # set when the answer is saved
+)
+
+# Hot-path lookups: last interaction of a session, session logs, sessions per user.
+# The trailing id makes (timestamp, id) keyset pagination an index range scan.
+Index(
+    "ix_interactions_session_id_timestamp_id",
+    interactions_table.c.session_id,
+    interactions_table.c.timestamp,
+    interactions_table.c.id
+)
+Index(
+    "ix_sessions_user_email_created_at_id",
+    sessions_table.c.user_email,
+    sessions_table.c.created_at,
+    sessions_table.c.id
 )
 
 users_table = Table(
@@ -81,4 +109,96 @@ user_skill_history_table = Table(
     Column("skill_name", String),
     Column("score", Float),
     Column("timestamp", DateTime(timezone=True), default=lambda: datetime.now(ZoneInfo("Asia/Tokyo"))),
-)
\ No newline at end of file
+)
+
+Index(
+    "ix_user_skill_history_user_email_skill_name_timestamp",
+    user_skill_history_table.c.user_email,
+    user_skill_history_table.c.skill_name,
+    user_skill_history_table.c.timestamp
+)
+
+# Rolling per-user history summary and the last advice generated from it
+advice_summaries_table = Table(
+    "advice_summaries",
+    metadata,
+    Column("user_email", String, ForeignKey("users.email"), primary_key=True),
+    Column("summary", Text),
+    # (answered_at, id) of the last answer folded into the summary
+    Column("summarized_answered_at", DateTime(timezone=True), nullable=True),
+    Column("summarized_interaction_id", Integer, default=0),
+    Column("advice", Text, nullable=True),
+    Column("updated_at", DateTime(timezone=True)),
+)
+
+# Per-session counters for the history list, maintained on every interaction write
+session_summaries_table = Table(
+    "session_summaries",
+    metadata,
+    Column("session_id", String, ForeignKey("sessions.id"), primary_key=True),
+    Column("user_email", String, ForeignKey("users.email")),
+    Column("created_at", DateTime(timezone=True)),
+    Column("question_count", Integer, nullable=False, default=0),
+    Column("answered_count", Integer, nullable=False, default=0),
+    Column("score_total", Integer, nullable=False, default=0),
+    Column("scored_count", Integer, nullable=False, default=0),
+    Column("last_activity_at", DateTime(timezone=True)),
+)
+
+Index(
+    "ix_session_summaries_user_email_created_at_session_id",
+    session_summaries_table.c.user_email,
+    session_summaries_table.c.created_at,
+    session_summaries_table.c.session_id
+)
+
+# Per-skill score averages bucketed by day and week, kept current on write for progress charts
+user_skill_rollups_table = Table(
+    "user_skill_rollups",
+    metadata,
+    Column("user_email", String, ForeignKey("users.email"), primary_key=True),
+    Column("period", String, primary_key=True),  # "day" or "week"
+    Column("skill_name", String, primary_key=True),
+    Column("bucket_start", DateTime(timezone=True), primary_key=True),
+    Column("score_total", Float, nullable=False, default=0),
+    Column("score_count", Integer, nullable=False, default=0),
+)
+
+# Shared tier of the LLM response cache, keyed by a hash of model, messages and parameters
+llm_cache_table = Table(
+    "llm_cache",
+    metadata,
+    Column("key", String(64), primary_key=True),
+    Column("model", String),
+    Column("content", Text),
+    Column("prompt_tokens", Integer, default=0),
+    Column("completion_tokens", Integer, default=0),
+    Column("expires_at", DateTime(timezone=True), index=True),
+)
+
+# Completed responses replayable by idempotency key (or the natural key of an answer)
+idempotency_keys_table = Table(
+    "idempotency_keys",
+    metadata,
+    Column("key", String(64), primary_key=True),  # sha256 of user, endpoint and client key
+    Column("user_email", String, ForeignKey("users.email")),
+    Column("response", Text),
+    Column("expires_at", DateTime(timezone=True), index=True),
+)
+
+# Progress and checkpoint of long-running batch jobs (bulk re-scoring), one row per job name
+batch_jobs_table = Table(
+    "batch_jobs",
+    metadata,
+    Column("name", String, primary_key=True),
+    Column("kind", String),
+    Column("cursor", String),  # key of the last item that, with everything before it, is written
+    Column("failed_keys", Text),  # JSON list of keys whose scoring failed; retried when the job resumes
+    Column("status", String),
+    Column("processed", Integer, default=0),
+    Column("failed", Integer, default=0),
+    Column("prompt_tokens", Integer, default=0),
+    Column("completion_tokens", Integer, default=0),
+    Column("started_at", DateTime(timezone=True)),
+    Column("updated_at", DateTime(timezone=True)),
+)
@@ -0,0 +1,124 @@
+"""
+Bulk re-scoring of historical answers (see app/services/rescore.py).
+
+    python -m app.rescore feedback                  # re-grade every answer
+    python -m app.rescore skills --user a@b.c       # rebuild one user's skill history
+    python -m app.rescore feedback --max-tokens 2000000 --qps 5
+    python -m app.rescore --status rescore-feedback
+
+Ctrl-C (or SIGTERM) stops dispatching, writes what finished and exits;
+running the same command again resumes from the checkpoint (retrying
+items that failed). Pass --restart to start over.
+"""
+import argparse
+import asyncio
+import json
+import signal
+
+from app.db import database, read_database
+from app.services.llm_client import close_client
+from app.services.rescore import (
+    RESCORE_BATCH_SIZE,
+    RESCORE_CONCURRENCY,
+    RESCORE_MAX_TOKENS,
+    RESCORE_QPS,
+    SCOPES,
+    JobConflict,
+    RescoreJob,
+    fetch_job
+)
+
+PROGRESS_INTERVAL = 10
+
+
+def _print_progress(progress: dict):
+    print(
+        f"{progress['status']:<8} {progress['processed']} done, {progress['failed']} failed, "
+        f"{progress['per_second']}/s, {progress['prompt_tokens'] + progress['completion_tokens']} tokens "
+        f"({progress['tokens_per_second']}/s), cursor {progress['cursor']}"
+    )
+
+
+async def _report(job: RescoreJob):
+    while True:
+        await asyncio.sleep(PROGRESS_INTERVAL)
+        _print_progress(job.progress())
+
+
+async def rescore(args) -> int:
+    job = RescoreJob(
+        args.scope,
+        name=args.name,
+        concurrency=args.concurrency,
+        qps=args.qps,
+        max_tokens=args.max_tokens,
+        batch_size=args.batch_size,
+        user_email=args.user
+    )
+    try:
+        await job.claim(restart=args.restart)
+    except JobConflict as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"▶️  {job.name}: resuming after {job.cursor}" if job.cursor else f"▶️  {job.name}: starting")
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, job.stop, "interrupted")
+    reporter = asyncio.ensure_future(_report(job))
+    try:
+        await job.run()
+    finally:
+        reporter.cancel()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(sig)
+
+    _print_progress(job.progress())
+    if job.status == "paused":
+        print(f"⏸️  Stopped ({job.stop_reason}); run the same command again to resume.")
+    else:
+        print(f"✅ {job.name} finished in {job.progress()['elapsed_seconds']}s.")
+    if job.failed_keys:
+        print(f"⚠️  {len(job.failed_keys)} items failed; run the same command again to retry them.")
+    return 0
+
+
+async def main(args) -> int:
+    await database.connect()
+    if read_database is not database:
+        await read_database.connect()
+    try:
+        if args.status:
+            job = await fetch_job(args.status)
+            print(json.dumps(job, indent=2) if job else f"No job named {args.status!r}.")
+            return 0 if job else 1
+        return await rescore(args)
+    finally:
+        await database.disconnect()
+        if read_database is not database:
+            await read_database.disconnect()
+        await close_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-score historical answers with the current prompts.")
+    parser.add_argument("scope", nargs="?", choices=SCOPES, help="what to re-score")
+    parser.add_argument("--name", help="job name (default rescore-<scope>); reusing a name resumes it")
+    parser.add_argument("--concurrency", type=int, default=RESCORE_CONCURRENCY, help="items scored at once")
+    parser.add_argument("--qps", type=float, default=RESCORE_QPS, help="LLM calls per second (0 = unlimited)")
+    parser.add_argument(
+        "--max-tokens", type=int, default=RESCORE_MAX_TOKENS,
+        help="stop after this many LLM tokens in this run (0 = unlimited)"
+    )
+    parser.add_argument("--batch-size", type=int, default=RESCORE_BATCH_SIZE, help="results written per transaction")
+    parser.add_argument("--user", help="only re-score this user's answers")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start over")
+    parser.add_argument("--status", metavar="NAME", help="show a job's stored progress and exit")
+    args = parser.parse_args()
+    if not args.status and not args.scope:
+        parser.error("a scope is required unless --status is given")
+    if args.concurrency < 1 or args.batch_size < 1:
+        parser.error("--concurrency and --batch-size must be at least 1")
+    if args.qps < 0 or args.max_tokens < 0:
+        parser.error("--qps and --max-tokens cannot be negative")
+    raise SystemExit(asyncio.run(main(args)))
@@ -0,0 +1,156 @@
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.db import database, read_database
+from app.models import advice_summaries_table, interactions_table, sessions_table
+from app.utils import format_interactions, summarize_history, generate_advice
+
+# Max prompt size for one summary update (rough estimate: ~4 characters per token)
+ADVICE_TOKEN_BUDGET = int(os.getenv("ADVICE_TOKEN_BUDGET", "3000"))
+ADVICE_SUMMARY_WORDS = int(os.getenv("ADVICE_SUMMARY_WORDS", "300"))
+ADVICE_FETCH_BATCH = 100
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _answered_interactions(user_email: str):
+    return (
+        interactions_table.select()
+        .select_from(interactions_table.join(
+            sessions_table, interactions_table.c.session_id == sessions_table.c.id
+        ))
+        .where(sessions_table.c.user_email == user_email)
+        .where(interactions_table.c.answered_at.isnot(None))
+    )
+
+
+async def latest_answer(user_email: str) -> Optional[tuple[datetime, int]]:
+    """(answered_at, id) of the user's most recently answered interaction."""
+    # Ids follow question order, not answer order, so answers are ordered by when they were saved
+    query = (
+        select(interactions_table.c.answered_at, interactions_table.c.id)
+        .select_from(interactions_table.join(
+            sessions_table, interactions_table.c.session_id == sessions_table.c.id
+        ))
+        .where(sessions_table.c.user_email == user_email)
+        .where(interactions_table.c.answered_at.isnot(None))
+        .order_by(interactions_table.c.answered_at.desc(), interactions_table.c.id.desc())
+        .limit(1)
+    )
+    row = await read_database.fetch_one(query)
+    return (row["answered_at"], row["id"]) if row else None
+
+
+def _clip(interaction, budget: int) -> dict:
+    # A single oversized answer must not blow the budget on its own
+    max_chars = budget * CHARS_PER_TOKEN // 3
+    return {
+        key: (interaction[key] or "")[:max_chars] or None
+        for key in ("question", "answer", "feedback")
+    } | {"id": interaction["id"], "answered_at": interaction["answered_at"]}
+
+
+def _budget_chunks(interactions: list, budget: int):
+    """Split interactions into chunks whose formatted text fits the token budget."""
+    chunk, used = [], 0
+    for interaction in (_clip(i, budget) for i in interactions):
+        cost = estimate_tokens(format_interactions([interaction]))
+        if chunk and used + cost > budget:
+            yield chunk
+            chunk, used = [], 0
+        chunk.append(interaction)
+        used += cost
+    if chunk:
+        yield chunk
+
+
+async def _fold_new_interactions(
+    user_email: str,
+    summary: Optional[str],
+    after: Optional[tuple[datetime, int]]
+) -> tuple[Optional[str], Optional[tuple[datetime, int]]]:
+    """Fold interactions answered after `after` (answered_at, id) into the summary, in budget-sized chunks."""
+    # Leave room in the prompt for the summary being carried forward
+    budget = max(ADVICE_TOKEN_BUDGET - ADVICE_SUMMARY_WORDS * 2, ADVICE_TOKEN_BUDGET // 2)
+    while True:
+        query = (
+            _answered_interactions(user_email)
+            .order_by(interactions_table.c.answered_at.asc(), interactions_table.c.id.asc())
+            .limit(ADVICE_FETCH_BATCH)
+        )
+        if after is not None:
+            query = query.where(tuple_(interactions_table.c.answered_at, interactions_table.c.id) > after)
+        rows = await read_database.fetch_all(query)
+        if not rows:
+            return summary, after
+
+        for chunk in _budget_chunks(rows, budget):
+            summary = await summarize_history(summary, chunk, max_words=ADVICE_SUMMARY_WORDS)
+            after = (chunk[-1]["answered_at"], chunk[-1]["id"])
+
+
+async def prepare_advice(user_email: str) -> Optional[dict]:
+    """
+    Bring the user's history summary up to date.
+    Returns None if the user has no answered interactions, otherwise a dict
+    with the refreshed "summary" and "summarized" watermark ((answered_at, id)
+    of the last answer folded in), plus the stored "advice" when no new
+    answers arrived since it was generated.
+    """
+    # History is read from the replica (a lagging replica only delays new answers to the next call);
+    # the summary row is our own write, so it comes from the primary
+    latest = await latest_answer(user_email)
+    if latest is None:
+        return None
+
+    row = await database.fetch_one(
+        advice_summaries_table.select().where(advice_summaries_table.c.user_email == user_email)
+    )
+    summarized = None
+    if row and row["summarized_answered_at"] is not None:
+        summarized = (row["summarized_answered_at"], row["summarized_interaction_id"])
+    if row and row["advice"] and summarized is not None and summarized >= latest:
+        return {"summary": row["summary"], "summarized": summarized, "advice": row["advice"]}
+
+    summary, summarized = await _fold_new_interactions(user_email, row["summary"] if row else None, summarized)
+    return {"summary": summary, "summarized": summarized, "advice": None}
+
+
+async def store_advice(user_email: str, state: dict, advice: str):
+    answered_at, interaction_id = state["summarized"]
+    values = {
+        "summary": state["summary"],
+        "summarized_answered_at": answered_at,
+        "summarized_interaction_id": interaction_id,
+        "advice": advice,
+        "updated_at": datetime.now(timezone.utc)
+    }
+    await database.execute(
+        pg_insert(advice_summaries_table)
+        .values(user_email=user_email, **values)
+        .on_conflict_do_update(index_elements=["user_email"], set_=values)
+    )
+
+
+async def get_advice(user_email: str) -> Optional[str]:
+    """
+    Return advice for the user, regenerating it only when new answers arrived
+    since the last call. Only interactions newer than the stored summary are
+    sent to the model. Returns None if the user has no answered interactions.
+    """
+    state = await prepare_advice(user_email)
+    if state is None:
+        return None
+    if state["advice"]:
+        return state["advice"]
+
+    advice = await generate_advice(state["summary"])
+    await store_advice(user_email, state, advice)
+    return advice
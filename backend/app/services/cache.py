@@ -0,0 +1,108 @@
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Small per-process LRU cache with a time-to-live per entry.
+    Keeps hit/miss counters so callers can report them.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING or entry[0] < time.monotonic():
+            if entry is not _MISSING:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class SizedTTLCache(TTLCache):
+    """
+    TTLCache bounded by the total size of its values instead of the entry
+    count; `sizeof` gives an entry's size in bytes.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float = 60, sizeof: Callable[[Any], int] = len):
+        super().__init__(maxsize=sys.maxsize, ttl=ttl)
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.bytes = 0
+        self._sizes: dict[Hashable, int] = {}
+
+    def _forget(self, key: Hashable):
+        self.bytes -= self._sizes.pop(key, 0)
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        value = super().get(key, _MISSING)
+        if value is _MISSING:
+            if key not in self._data:  # expired entries are dropped by the lookup
+                self._forget(key)
+            return default
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            self.invalidate(key)
+            return
+        self._forget(key)
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        self._sizes[key] = size
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            evicted, _ = self._data.popitem(last=False)
+            self._forget(evicted)
+
+    def invalidate(self, key: Hashable):
+        super().invalidate(key)
+        self._forget(key)
+
+    def clear(self):
+        super().clear()
+        self._sizes.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        return {**super().stats(), "bytes": self.bytes}
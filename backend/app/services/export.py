@@ -0,0 +1,149 @@
+"""
+Full-history export as NDJSON or CSV, optionally zstd-compressed.
+
+Rows are streamed from a database cursor and encoded in small buffers, so
+memory stays flat however long the history is. NDJSON can hold every table
+(each line has a "table" field); CSV holds one table per file.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from app.db import read_database
+from app.models import (
+    interactions_table,
+    sessions_table,
+    session_summaries_table,
+    user_skill_history_table
+)
+from app.services.session_summaries import serialize_summary
+
+TABLES = ("sessions", "interactions", "skill_history")
+FORMATS = ("ndjson", "csv")
+COLUMNS = {
+    "sessions": ["id", "user_email", "created_at", "question_count", "answered_count", "average_score", "last_activity_at"],
+    "interactions": ["id", "session_id", "user_email", "question", "answer", "feedback", "score", "timestamp"],
+    "skill_history": ["user_email", "skill_name", "score", "timestamp"],
+}
+# Encoded bytes collected before a chunk is sent (or compressed)
+CHUNK_BYTES = 64 * 1024
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def _query(table: str, user_email: Optional[str]):
+    # Each ordering matches an index, so the cursor streams without a sort
+    if table == "sessions":
+        t = session_summaries_table
+        query = select(t).order_by(t.c.user_email, t.c.created_at, t.c.session_id)
+    elif table == "interactions":
+        t = interactions_table
+        query = (
+            select(t, sessions_table.c.user_email)
+            .select_from(t.join(sessions_table, t.c.session_id == sessions_table.c.id))
+            .order_by(t.c.session_id, t.c.timestamp, t.c.id)
+        )
+    else:
+        t = user_skill_history_table
+        query = select(t).order_by(t.c.user_email, t.c.skill_name, t.c.timestamp)
+    if user_email is not None:
+        query = query.where((sessions_table if table == "interactions" else t).c.user_email == user_email)
+    return query
+
+
+def _record(table: str, row) -> dict:
+    if table == "sessions":
+        return serialize_summary(row)
+    return {
+        column: value.isoformat() if isinstance(value, datetime) else value
+        for column, value in ((column, row[column]) for column in COLUMNS[table])
+    }
+
+
+async def export_records(tables, user_email: Optional[str] = None) -> AsyncIterator[tuple[str, dict]]:
+    """(table, record) pairs for one user (or everyone), streamed from the read database."""
+    for table in tables:
+        rows = read_database.iterate(_query(table, user_email))
+        try:
+            async for row in rows:
+                yield table, _record(table, row)
+        finally:
+            await rows.aclose()
+
+
+async def _encode(fmt: str, tables, user_email: Optional[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(buffer, fieldnames=COLUMNS[tables[0]])
+        writer.writeheader()
+    records = export_records(tables, user_email)
+    try:
+        async for table, record in records:
+            if writer is not None:
+                writer.writerow(record)
+            else:
+                buffer.write(json.dumps({"table": table, **record}, ensure_ascii=False))
+                buffer.write("\n")
+            if buffer.tell() >= CHUNK_BYTES:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+    finally:
+        await records.aclose()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def export_stream(
+    fmt: str,
+    tables,
+    user_email: Optional[str] = None,
+    compress: Optional[str] = None
+) -> AsyncIterator[bytes]:
+    """Encoded (and optionally zstd-compressed) export chunks."""
+    chunks = _encode(fmt, tables, user_email)
+    if compress != "zstd":
+        async for chunk in chunks:
+            yield chunk
+        return
+    import zstandard
+    compressor = zstandard.ZstdCompressor().compressobj()
+    try:
+        async for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+    finally:
+        await chunks.aclose()
+    yield compressor.flush()
+
+
+def export_tables(fmt: str, table: str) -> tuple[str, ...]:
+    if table == "all":
+        if fmt == "csv":
+            raise ValueError("CSV export holds one table: choose sessions, interactions or skill_history.")
+        return TABLES
+    return (table,)
+
+
+def export_response(fmt: str, table: str, compress: Optional[str], user_email: Optional[str] = None) -> StreamingResponse:
+    try:
+        tables = export_tables(fmt, table)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    filename = f"interview-{table}.{fmt}" + (".zst" if compress == "zstd" else "")
+    return StreamingResponse(
+        export_stream(fmt, tables, user_email, compress),
+        media_type="application/zstd" if compress == "zstd" else MEDIA_TYPES[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store",
+            "X-Accel-Buffering": "no"
+        }
+    )
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+
+from app.services.skill_store import fetch_last_skill_scores, save_skill_scores
+from app.utils import generate_feedback, extract_skill_scores, stream_feedback, parse_feedback
+
+logger = logging.getLogger("uvicorn")
+
+# Skill extraction is best-effort: feedback is returned even if it times out
+SKILL_EXTRACTION_TIMEOUT = float(os.getenv("SKILL_EXTRACTION_TIMEOUT", "20"))
+
+
+async def score_and_save_skills(user_email: str, answer: str) -> dict[str, float]:
+    """Extract and persist updated skill scores for one answer (used by the deferred queue)."""
+    last_skill_scores = await fetch_last_skill_scores(user_email)
+    updated_skill_scores = await asyncio.wait_for(
+        extract_skill_scores(answer, last_skill_scores), SKILL_EXTRACTION_TIMEOUT
+    )
+    await save_skill_scores(user_email, updated_skill_scores)
+    return updated_skill_scores
+
+
+async def _timed(timings: dict, stage: str, coro):
+    start = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        timings[stage] = round((time.perf_counter() - start) * 1000, 1)
+
+
+async def _score_skills(user_email: str, answer: str, timings: dict, last_skill_scores: Optional[dict] = None):
+    if last_skill_scores is None:
+        last_skill_scores = await _timed(timings, "skills_read", fetch_last_skill_scores(user_email))
+    return await _timed(
+        timings, "extract_skill_scores",
+        asyncio.wait_for(extract_skill_scores(answer, last_skill_scores), SKILL_EXTRACTION_TIMEOUT)
+    )
+
+
+async def _skipped():
+    return None
+
+
+async def run_feedback_pipeline(
+    question: str,
+    answer: str,
+    user_email: str,
+    include_skills: bool = True,
+    last_skill_scores: Optional[dict] = None
+) -> dict:
+    """
+    Grade the answer and extract updated skill scores concurrently.
+    Returns {"feedback", "score", "skills", "timings"}; "skills" is None
+    when skill extraction failed, timed out or was not requested.
+    Timings are per-stage wall-clock milliseconds. Pass `last_skill_scores`
+    when the caller already holds the user's current scores to skip reading them.
+    """
+    timings: dict[str, float] = {}
+    start = time.perf_counter()
+
+    feedback_result, skills_result = await asyncio.gather(
+        _timed(timings, "generate_feedback", generate_feedback(question, answer)),
+        _score_skills(user_email, answer, timings, last_skill_scores) if include_skills else _skipped(),
+        return_exceptions=True
+    )
+
+    if isinstance(feedback_result, BaseException):
+        raise feedback_result
+    feedback, score = feedback_result
+
+    if isinstance(skills_result, BaseException):
+        logger.warning("Skill extraction failed for %s: %r", user_email, skills_result)
+        skills_result = None
+
+    timings["total"] = round((time.perf_counter() - start) * 1000, 1)
+
+    return {
+        "feedback": feedback,
+        "score": score,
+        "skills": skills_result,
+        "timings": timings
+    }
+
+
+async def stream_feedback_pipeline(
+    question: str,
+    answer: str,
+    user_email: str,
+    include_skills: bool = True,
+    last_skill_scores: Optional[dict] = None
+):
+    """
+    Streaming variant of run_feedback_pipeline: skill extraction runs in the
+    background while feedback tokens are streamed. Yields ("token", text)
+    pairs, then a final ("result", dict) with the same shape as run_feedback_pipeline.
+    """
+    timings: dict[str, float] = {}
+    start = time.perf_counter()
+    skills_task = asyncio.ensure_future(
+        _score_skills(user_email, answer, timings, last_skill_scores) if include_skills else _skipped()
+    )
+
+    try:
+        parts = []
+        async for delta in stream_feedback(question, answer):
+            if not parts:
+                timings["first_token"] = round((time.perf_counter() - start) * 1000, 1)
+            parts.append(delta)
+            yield "token", delta
+        timings["generate_feedback"] = round((time.perf_counter() - start) * 1000, 1)
+        feedback, score = parse_feedback("".join(parts))
+
+        try:
+            skills_result = await skills_task
+        except Exception as e:
+            logger.warning("Skill extraction failed for %s: %r", user_email, e)
+            skills_result = None
+    finally:
+        if not skills_task.done():
+            skills_task.cancel()
+
+    timings["total"] = round((time.perf_counter() - start) * 1000, 1)
+
+    yield "result", {
+        "feedback": feedback,
+        "score": score,
+        "skills": skills_result,
+        "timings": timings
+    }
@@ -0,0 +1,76 @@
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.db import database
+from app.models import idempotency_keys_table
+
+logger = logging.getLogger("uvicorn")
+
+# How long a completed response can be replayed for the same key
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+# Expired keys are purged once every this many saves
+IDEMPOTENCY_PURGE_EVERY = 500
+
+_saves = 0
+
+
+def idempotency_key(user_email: str, scope: str, key: str) -> str:
+    """Storage key: client keys are only unique per user and endpoint."""
+    return hashlib.sha256(f"{user_email}\n{scope}\n{key}".encode("utf-8")).hexdigest()
+
+
+def answer_key(session_id: str, interaction_id: int, answer: str) -> str:
+    answer_hash = hashlib.sha256(answer.encode("utf-8")).hexdigest()
+    return f"{session_id}:{interaction_id}:{answer_hash}"
+
+
+async def load_response(user_email: str, scope: str, keys: list[Optional[str]]) -> Optional[dict]:
+    """Stored response for the first of `keys` that has one (one query for all of them)."""
+    keys = [k for k in keys if k]
+    if not keys:
+        return None
+    hashed = [idempotency_key(user_email, scope, key) for key in keys]
+    query = (
+        idempotency_keys_table.select()
+        .where(idempotency_keys_table.c.key.in_(hashed))
+        .where(idempotency_keys_table.c.expires_at > datetime.now(timezone.utc))
+    )
+    rows = {row["key"]: row for row in await database.fetch_all(query)}
+    for key in hashed:
+        if key in rows:
+            return json.loads(rows[key]["response"])
+    return None
+
+
+async def save_response(user_email: str, scope: str, keys: list[Optional[str]], response: dict):
+    """Store `response` under every given key (first write wins). Never raises."""
+    global _saves
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "key": idempotency_key(user_email, scope, key),
+            "user_email": user_email,
+            "response": json.dumps(response),
+            "expires_at": now + timedelta(seconds=IDEMPOTENCY_TTL),
+        }
+        for key in dict.fromkeys(k for k in keys if k)
+    ]
+    if not rows:
+        return
+    try:
+        await database.execute(
+            pg_insert(idempotency_keys_table).values(rows).on_conflict_do_nothing(index_elements=["key"])
+        )
+        _saves += 1
+        if _saves % IDEMPOTENCY_PURGE_EVERY == 0:
+            await database.execute(
+                idempotency_keys_table.delete().where(idempotency_keys_table.c.expires_at <= now)
+            )
+    except Exception as e:
+        logger.warning("Saving idempotent response failed: %r", e)
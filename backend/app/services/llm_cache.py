@@ -0,0 +1,154 @@
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.db import database
+from app.models import llm_cache_table
+from app.services.cache import SizedTTLCache
+from app.services.metrics import registry
+
+logger = logging.getLogger("uvicorn")
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))
+# Also share responses between workers through the llm_cache table
+LLM_CACHE_SHARED = os.getenv("LLM_CACHE_SHARED", "0") == "1"
+# Expired shared entries are purged once every this many writes
+LLM_CACHE_PURGE_EVERY = 500
+
+# USD per 1M (prompt, completion) tokens, for the dollars-saved metric
+MODEL_PRICES = {
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+
+llm_cache_hits = registry.counter("llm_cache_hits_total", "LLM responses served from the response cache")
+llm_cache_misses = registry.counter("llm_cache_misses_total", "Cacheable LLM calls that missed the response cache")
+llm_cache_saved_dollars = registry.counter(
+    "llm_cache_saved_dollars_total", "Estimated OpenAI spend avoided by response cache hits (USD)"
+)
+
+
+def cache_key(model: str, messages: list[dict], params: dict) -> str:
+    payload = json.dumps([model, messages, params], sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def should_cache(cache: Optional[bool], params: dict) -> bool:
+    """
+    cache=None caches only deterministic calls (temperature=0); True caches
+    regardless, False opts out.
+    """
+    if not LLM_CACHE_ENABLED or cache is False:
+        return False
+    return cache is True or params.get("temperature") == 0
+
+
+def _cost(model: str, entry: dict) -> float:
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (entry["prompt_tokens"] * prompt_price + entry["completion_tokens"] * completion_price) / 1_000_000
+
+
+def _sizeof(entry: dict) -> int:
+    return len(entry["content"].encode("utf-8")) + 128
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache of chat completion results: an in-process LRU bounded by
+    bytes, and optionally the shared llm_cache table so every worker can
+    reuse a response. Failures of the shared tier are logged, never raised.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = LLM_CACHE_MAX_BYTES,
+        ttl: float = LLM_CACHE_TTL,
+        shared: bool = LLM_CACHE_SHARED
+    ):
+        self.ttl = ttl
+        self.shared = shared
+        self.memory = SizedTTLCache(max_bytes=max_bytes, ttl=ttl, sizeof=_sizeof)
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+
+    async def get(self, key: str, model: str) -> Optional[dict]:
+        entry, tier = self.memory.get(key), "memory"
+        if entry is None and self.shared:
+            entry, tier = await self._get_shared(key), "shared"
+            if entry is not None:
+                self.memory.set(key, entry)
+
+        if entry is None:
+            self.misses += 1
+            llm_cache_misses.inc(model=model)
+            return None
+        self.hits += 1
+        llm_cache_hits.inc(model=model, tier=tier)
+        llm_cache_saved_dollars.inc(_cost(model, entry), model=model)
+        return entry
+
+    async def set(self, key: str, model: str, content: str, usage=None):
+        entry = {
+            "content": content,
+            "prompt_tokens": (usage.prompt_tokens or 0) if usage else 0,
+            "completion_tokens": (usage.completion_tokens or 0) if usage else 0,
+        }
+        self.memory.set(key, entry)
+        if self.shared:
+            await self._set_shared(key, model, entry)
+
+    async def _get_shared(self, key: str) -> Optional[dict]:
+        try:
+            row = await database.fetch_one(
+                llm_cache_table.select()
+                .where(llm_cache_table.c.key == key)
+                .where(llm_cache_table.c.expires_at > datetime.now(timezone.utc))
+            )
+        except Exception as e:
+            logger.warning("LLM cache read failed: %r", e)
+            return None
+        if row is None:
+            return None
+        return {
+            "content": row["content"],
+            "prompt_tokens": row["prompt_tokens"] or 0,
+            "completion_tokens": row["completion_tokens"] or 0,
+        }
+
+    async def _set_shared(self, key: str, model: str, entry: dict):
+        now = datetime.now(timezone.utc)
+        values = {**entry, "key": key, "model": model, "expires_at": now + timedelta(seconds=self.ttl)}
+        upsert = pg_insert(llm_cache_table).values(values)
+        upsert = upsert.on_conflict_do_update(
+            index_elements=["key"],
+            set_={name: upsert.excluded[name] for name in values if name != "key"}
+        )
+        try:
+            await database.execute(upsert)
+            self._writes += 1
+            if self._writes % LLM_CACHE_PURGE_EVERY == 0:
+                await database.execute(llm_cache_table.delete().where(llm_cache_table.c.expires_at <= now))
+        except Exception as e:
+            logger.warning("LLM cache write failed: %r", e)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.memory),
+            "bytes": self.memory.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+llm_cache = LLMResponseCache()
@@ -0,0 +1,196 @@
+import asyncio
+import os
+import time
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Optional
+
+from fastapi import HTTPException, Request
+
+from app.services.llm_cache import llm_cache, cache_key, should_cache
+from app.services.llm_scheduler import llm_scheduler, as_llm_error, failure_outcome
+from app.services.metrics import (
+    llm_request_seconds,
+    llm_prompt_tokens,
+    llm_completion_tokens,
+    llm_errors,
+    record_stage
+)
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+# Shared LLM client settings (override via environment); concurrency, retries
+# and rate limits live in llm_scheduler
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+DISCONNECT_POLL_INTERVAL = 0.5
+
+_client: Optional["AsyncOpenAI"] = None
+
+# Token tally for callers that budget their own usage (batch jobs): set a
+# {"prompt_tokens": 0, "completion_tokens": 0} dict and calls made in that context add to it
+llm_usage: ContextVar[Optional[dict]] = ContextVar("llm_usage", default=None)
+
+
+def get_client() -> "AsyncOpenAI":
+    """
+    Return the process-wide AsyncOpenAI client (one pooled HTTP connection set).
+    The SDK is slow to import, so it loads here rather than with the app; the
+    startup warm-up calls this once the server is up.
+    """
+    global _client
+    if _client is None:
+        from openai import AsyncOpenAI
+        # Retries are done by the scheduler (with backoff and a circuit breaker)
+        _client = AsyncOpenAI(timeout=LLM_TIMEOUT, max_retries=0)
+    return _client
+
+
+def _record_usage(model: str, usage):
+    if usage is not None:
+        llm_prompt_tokens.inc(usage.prompt_tokens or 0, model=model)
+        llm_completion_tokens.inc(usage.completion_tokens or 0, model=model)
+        tally = llm_usage.get()
+        if tally is not None:
+            tally["prompt_tokens"] += usage.prompt_tokens or 0
+            tally["completion_tokens"] += usage.completion_tokens or 0
+
+
+async def chat_completion(
+    messages: list[dict],
+    model: str,
+    stage: str = "llm",
+    cache: Optional[bool] = None,
+    **params
+) -> str:
+    """
+    Run a chat completion without blocking the event loop, through the
+    scheduler (rate limits, concurrency cap, retries, hedging, breaker).
+    `stage` names the call in the Server-Timing header.
+    `cache` controls the response cache (see llm_cache.should_cache).
+    Returns the stripped message content; failures raise LLMError.
+    """
+    key = cache_key(model, messages, params) if should_cache(cache, params) else None
+    if key:
+        start = time.perf_counter()
+        entry = await llm_cache.get(key, model)
+        if entry is not None:
+            record_stage(f"{stage}_cached", (time.perf_counter() - start) * 1000)
+            return entry["content"]
+
+    async def attempt():
+        start = time.perf_counter()
+        try:
+            return await get_client().chat.completions.create(
+                model=model,
+                messages=messages,
+                **params
+            )
+        except Exception:
+            llm_errors.inc(model=model)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            llm_request_seconds.observe(elapsed, model=model, stream="false")
+            record_stage(stage, elapsed * 1000)
+
+    response = await llm_scheduler.run(attempt, hedge=True)
+    _record_usage(model, response.usage)
+    content = response.choices[0].message.content.strip()
+    if key:
+        await llm_cache.set(key, model, content, response.usage)
+    return content
+
+
+async def stream_chat_completion(
+    messages: list[dict],
+    model: str,
+    stage: str = "llm",
+    cache: Optional[bool] = None,
+    **params
+):
+    """
+    Stream a chat completion, yielding content deltas as they arrive.
+    The concurrency slot is held until the stream is exhausted or closed;
+    only opening the stream is retried.
+    A cached response is yielded as a single delta; a complete stream is cached.
+    """
+    key = cache_key(model, messages, params) if should_cache(cache, params) else None
+    if key:
+        entry = await llm_cache.get(key, model)
+        if entry is not None:
+            record_stage(f"{stage}_cached", 0)
+            yield entry["content"]
+            return
+
+    async def open_stream():
+        try:
+            return await get_client().chat.completions.create(
+                model=model,
+                messages=messages,
+                stream=True,
+                stream_options={"include_usage": True},
+                **params
+            )
+        except Exception:
+            llm_errors.inc(model=model)
+            raise
+
+    llm_scheduler.admit()
+    parts, usage, outcome = [], None, None
+    try:
+        async with llm_scheduler.slot():
+            start = time.perf_counter()
+            try:
+                try:
+                    stream = await llm_scheduler.retrying(open_stream)
+                except Exception as e:
+                    outcome = failure_outcome(e)
+                    raise as_llm_error(e) from e
+                record_stage(f"{stage}_first_byte", (time.perf_counter() - start) * 1000)
+                try:
+                    async for chunk in stream:
+                        # The final chunk carries token usage and no choices
+                        _record_usage(model, chunk.usage)
+                        usage = chunk.usage or usage
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            parts.append(chunk.choices[0].delta.content)
+                            yield chunk.choices[0].delta.content
+                except Exception as e:
+                    llm_errors.inc(model=model)
+                    outcome = failure_outcome(e)
+                    raise
+                finally:
+                    await stream.close()
+                outcome = True
+            finally:
+                llm_request_seconds.observe(time.perf_counter() - start, model=model, stream="true")
+    finally:
+        llm_scheduler.record(outcome)
+    if key:
+        await llm_cache.set(key, model, "".join(parts).strip(), usage)
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+async def run_until_disconnect(request: Request, coro):
+    """
+    Await `coro`, cancelling it if the HTTP client goes away first
+    so an abandoned request does not keep an LLM slot busy.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client closed request")
+    finally:
+        if not task.done():
+            task.cancel()
@@ -0,0 +1,298 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+
+from app.services.cache import TTLCache
+from app.services.metrics import registry
+
+T = TypeVar("T")
+
+# Global cap on in-flight completions per process, and how long a call may wait for a slot
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))
+# Retries of transient OpenAI errors (connection, timeout, 429, 5xx) with exponential backoff
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))
+# Send a second, identical request if the first has not answered after this many seconds (0 = off)
+LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "0"))
+# Per-user token bucket: sustained completions per second and burst size
+LLM_USER_RATE = float(os.getenv("LLM_USER_RATE", "0.5"))
+LLM_USER_BURST = float(os.getenv("LLM_USER_BURST", "20"))
+# Circuit breaker: open after this many consecutive failed calls, retry after the cooldown
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+# User whose request triggered the current LLM calls (set at authentication)
+llm_user: ContextVar[Optional[str]] = ContextVar("llm_user", default=None)
+
+llm_retries = registry.counter("llm_retries_total", "OpenAI calls retried after a transient error")
+llm_hedges = registry.counter("llm_hedged_total", "Hedged (duplicate) OpenAI requests sent")
+llm_shed = registry.counter("llm_shed_total", "LLM calls rejected before reaching OpenAI")
+
+
+class LLMError(Exception):
+    """An LLM call failed; `status_code` is what the API should answer with."""
+    status_code = 502
+
+    def __init__(self, detail: str, retry_after: Optional[float] = None):
+        super().__init__(detail)
+        self.retry_after = retry_after
+
+
+class LLMUnavailable(LLMError):
+    status_code = 503
+
+
+class LLMRateLimited(LLMError):
+    status_code = 429
+
+
+def _retryable(error: BaseException) -> bool:
+    import openai  # already loaded by the client that raised; keeps the SDK out of app startup
+    return isinstance(error, (
+        openai.APIConnectionError,  # includes timeouts
+        openai.RateLimitError,
+        openai.InternalServerError,
+        asyncio.TimeoutError,
+    ))
+
+
+def failure_outcome(error: BaseException) -> Optional[bool]:
+    """
+    The circuit-breaker outcome of a failed call: False for timeouts,
+    connection errors, 429s and 5xx, None (unknown) for client errors such
+    as 400/401/413 or an over-long prompt, which say nothing about OpenAI's health.
+    """
+    return False if _retryable(error) else None
+
+
+def as_llm_error(error: Exception) -> LLMError:
+    """The LLMError to surface for an OpenAI call that failed after retries."""
+    if _retryable(error):
+        return LLMUnavailable(f"The AI service is unavailable: {error}", LLM_RETRY_MAX_DELAY)
+    return LLMError(f"The AI service returned an error: {error}")
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self) -> bool:
+        if self.wait_time():
+            return False
+        self.tokens -= 1
+        return True
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures; once `cooldown` has passed
+    a single trial call is let through, and its outcome closes or reopens it.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if self.retry_after() == 0 and not self._trial:
+            self._trial = True
+            return True
+        return False
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def failure(self):
+        self.failures += 1
+        self._trial = False
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        # A trial call ended without an outcome (cancelled)
+        self._trial = False
+
+
+class LLMScheduler:
+    """
+    Sits in front of every OpenAI call: per-user rate limits, a global
+    concurrency cap, retries with backoff, optional hedging and a circuit
+    breaker that sheds load while OpenAI is failing.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        queue_timeout: float = LLM_QUEUE_TIMEOUT,
+        retries: int = LLM_MAX_RETRIES,
+        hedge_after: float = LLM_HEDGE_AFTER,
+        user_rate: float = LLM_USER_RATE,
+        user_burst: float = LLM_USER_BURST
+    ):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.retries = retries
+        self.hedge_after = hedge_after
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.breaker = CircuitBreaker(LLM_BREAKER_THRESHOLD, LLM_BREAKER_COOLDOWN)
+        self._buckets = TTLCache(maxsize=10000, ttl=3600)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+
+    def _bucket(self, user_email: str) -> TokenBucket:
+        bucket = self._buckets.get(user_email)
+        if bucket is None:
+            bucket = TokenBucket(self.user_rate, self.user_burst)
+            self._buckets.set(user_email, bucket)
+        return bucket
+
+    def check(self):
+        """Raise if a call would be rejected right now, without using up anything (for SSE routes)."""
+        if self.breaker.retry_after():
+            raise LLMUnavailable("The AI service is temporarily unavailable", self.breaker.retry_after())
+        user_email = llm_user.get()
+        if user_email:
+            wait = self._bucket(user_email).wait_time()
+            if wait:
+                raise LLMRateLimited("Too many AI requests, slow down", wait)
+
+    def admit(self):
+        if not self.breaker.allow():
+            llm_shed.inc(reason="breaker")
+            raise LLMUnavailable("The AI service is temporarily unavailable", self.breaker.retry_after())
+        user_email = llm_user.get()
+        if user_email:
+            bucket = self._bucket(user_email)
+            if not bucket.take():
+                self.breaker.release()
+                llm_shed.inc(reason="rate_limit")
+                raise LLMRateLimited("Too many AI requests, slow down", bucket.wait_time())
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one of the global concurrency slots."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            llm_shed.inc(reason="queue")
+            raise LLMUnavailable("The AI service is overloaded", self.queue_timeout)
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def retrying(self, attempt: Callable[[], Awaitable[T]]) -> T:
+        async for retry in AsyncRetrying(
+            stop=stop_after_attempt(self.retries + 1),
+            wait=wait_exponential_jitter(initial=LLM_RETRY_BASE_DELAY, max=LLM_RETRY_MAX_DELAY),
+            retry=retry_if_exception(_retryable),
+            before_sleep=lambda state: llm_retries.inc(),
+            reraise=True
+        ):
+            with retry:
+                return await attempt()
+
+    async def _hedged(self, attempt: Callable[[], Awaitable[T]]) -> T:
+        first = asyncio.ensure_future(attempt())
+        done, _ = await asyncio.wait({first}, timeout=self.hedge_after)
+        if done:
+            return first.result()
+
+        llm_hedges.inc()
+        pending = {first, asyncio.ensure_future(attempt())}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def run(self, attempt: Callable[[], Awaitable[T]], hedge: bool = False) -> T:
+        """
+        Run one logical LLM call. `attempt` makes a single request; it is
+        retried, and hedged when `hedge` is set and LLM_HEDGE_AFTER > 0.
+        Failures are raised as LLMError subclasses.
+        """
+        self.admit()
+
+        async def limited():
+            async with self.slot():
+                return await attempt()
+
+        once = (lambda: self._hedged(limited)) if hedge and self.hedge_after > 0 else limited
+        outcome = None
+        try:
+            result = await self.retrying(once)
+            outcome = True
+            return result
+        except LLMError:
+            outcome = None  # shed locally, says nothing about OpenAI's health
+            raise
+        except Exception as e:
+            outcome = failure_outcome(e)
+            raise as_llm_error(e) from e
+        finally:
+            self.record(outcome)
+
+    def record(self, outcome: Optional[bool]):
+        """Feed a call's outcome (True/False, None = unknown) to the circuit breaker."""
+        if outcome is True:
+            self.breaker.success()
+        elif outcome is False:
+            self.breaker.failure()
+        else:
+            self.breaker.release()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "breaker_open": int(self.breaker.opened_at is not None),
+            "consecutive_failures": self.breaker.failures,
+            "users": len(self._buckets),
+        }
+
+
+llm_scheduler = LLMScheduler()
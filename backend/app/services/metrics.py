@@ -0,0 +1,168 @@
+import bisect
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Stage timings of the request being handled: {stage: [total_ms, count]}
+_stages: ContextVar[Optional[dict]] = ContextVar("request_stages", default=None)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{str(value).replace(chr(34), chr(39))}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self._series = defaultdict(lambda: {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+
+    def observe(self, value: float, **labels):
+        series = self._series[_label_key(labels)]
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series["counts"][index] += 1
+        series["sum"] += value
+        series["count"] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series["counts"]):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(key, le)} {series['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series['sum']}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series['count']}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values = defaultdict(float)
+
+    def inc(self, amount: float = 1, **labels):
+        self._values[_label_key(labels)] += amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._gauges: dict[str, tuple[str, Callable[[], dict]]] = {}
+
+    def histogram(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help_text, buckets))
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, help_text))
+
+    def gauge(self, name: str, help_text: str, collect: Callable[[], dict]):
+        """Register a gauge read at scrape time; `collect` returns {stat: number}."""
+        self._gauges[name] = (help_text, collect)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        for name, (help_text, collect) in self._gauges.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            for label, value in collect().items():
+                lines.append(f'{name}{{stat="{label}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_seconds = registry.histogram("http_request_duration_seconds", "HTTP request latency")
+ws_message_seconds = registry.histogram("ws_message_duration_seconds", "Time to handle one WebSocket interview message")
+llm_request_seconds = registry.histogram("llm_request_duration_seconds", "OpenAI chat completion latency")
+llm_prompt_tokens = registry.counter("llm_prompt_tokens_total", "Prompt tokens sent to OpenAI")
+llm_completion_tokens = registry.counter("llm_completion_tokens_total", "Completion tokens received from OpenAI")
+llm_errors = registry.counter("llm_errors_total", "Failed OpenAI chat completions")
+db_query_seconds = registry.histogram("db_query_duration_seconds", "Database call latency")
+
+
+def record_stage(stage: str, ms: float):
+    """Add a stage duration to the current request's Server-Timing breakdown."""
+    stages = _stages.get()
+    if stages is not None:
+        entry = stages.setdefault(stage, [0.0, 0])
+        entry[0] += ms
+        entry[1] += 1
+
+
+def server_timing_header(stages: dict) -> str:
+    parts = []
+    for stage, (total_ms, count) in stages.items():
+        name = "".join(c if c.isalnum() or c in "-_" else "_" for c in stage)
+        part = f"{name};dur={total_ms:.1f}"
+        if count > 1:
+            part += f';desc="{count} calls"'
+        parts.append(part)
+    return ", ".join(parts)
+
+
+class MetricsMiddleware:
+    """
+    Times every HTTP request, collects per-stage timings recorded during it,
+    and adds them to the response as a Server-Timing header.
+    Stages finishing after the headers are sent (streaming) only show up in the LLM/DB histograms.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stages = {}
+        token = _stages.set(stages)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = server_timing_header(
+                    {**stages, "total": [(time.perf_counter() - start) * 1000, 1]}
+                )
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", header.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _stages.reset(token)
+            route = scope.get("route")
+            http_request_seconds.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=route.path if route else "unmatched",
+                status=status
+            )
@@ -0,0 +1,52 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+
+# bcrypt work factor for new hashes; older hashes below it are upgraded on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event loop
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+
+
+@lru_cache(maxsize=None)
+def _bcrypt():
+    # passlib loads its handler registry on import; deferred to the first login (or the startup warm-up)
+    from passlib.hash import bcrypt
+    return bcrypt
+
+
+@lru_cache(maxsize=None)
+def _hasher():
+    return _bcrypt().using(rounds=BCRYPT_ROUNDS)
+
+
+async def _run(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, partial(func, *args))
+
+
+async def hash_password(password: str) -> str:
+    return await _run(_hasher().hash, password)
+
+
+async def verify_password(password: str, hashed: str) -> bool:
+    try:
+        return await _run(_bcrypt().verify, password, hashed)
+    except ValueError:
+        # Malformed or non-bcrypt hash
+        return False
+
+
+def needs_rehash(hashed: str) -> bool:
+    """True if the stored hash uses a lower work factor than BCRYPT_ROUNDS."""
+    try:
+        return _bcrypt().from_string(hashed).rounds < BCRYPT_ROUNDS
+    except ValueError:
+        return False
+
+
+def shutdown_executor():
+    _executor.shutdown(wait=False)
@@ -0,0 +1,194 @@
+import os
+import re
+import zlib
+from functools import lru_cache
+from typing import TYPE_CHECKING, Awaitable, Callable, Optional
+
+from sqlalchemy import select
+
+from app.db import database
+from app.models import interactions_table, sessions_table
+from app.services.cache import TTLCache
+from app.services.metrics import registry
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Estimated Jaccard similarity (of content-word bigrams) at which a question counts as a repeat
+QUESTION_DEDUP_THRESHOLD = float(os.getenv("QUESTION_DEDUP_THRESHOLD", "0.7"))
+# Regenerations allowed per question before a near-duplicate is accepted anyway
+QUESTION_DEDUP_RETRIES = int(os.getenv("QUESTION_DEDUP_RETRIES", "2"))
+# Most recent questions indexed per user, and users kept in memory
+QUESTION_DEDUP_HISTORY = int(os.getenv("QUESTION_DEDUP_HISTORY", "5000"))
+QUESTION_DEDUP_USERS = int(os.getenv("QUESTION_DEDUP_USERS", "500"))
+QUESTION_DEDUP_TTL = float(os.getenv("QUESTION_DEDUP_TTL", "3600"))
+
+NUM_PERM = 64
+_MERSENNE_PRIME = (1 << 61) - 1
+
+question_duplicates = registry.counter(
+    "question_duplicates_total", "Generated questions rejected as near-duplicates of the user's history"
+)
+
+
+# Function words and question boilerplate ("how would you ...", "what are the ..."): bigrams of
+# these are shared by most questions, so they are dropped before shingling
+STOP_WORDS = frozenset("""
+    a an the and or but of to in on for with from by at as into about over under than then
+    is are was were be been being do does did can could would should will shall may might must
+    you your yours we our i me my it its this that these those there their they them he she his her
+    how what why when where which who whom whose if
+""".split())
+
+
+def _shingles(text: str) -> list[str]:
+    words = [word for word in re.findall(r"\w+", text.lower()) if word not in STOP_WORDS]
+    if len(words) < 2:
+        return words
+    return [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+@lru_cache(maxsize=None)
+def _permutations():
+    # numpy is imported on first use (or by the startup warm-up), not with the app
+    import numpy as np
+    rng = np.random.RandomState(1)
+    # Multipliers span the whole field: with small ones (a * h + b) rarely wraps mod the prime,
+    # so shingles with small hashes win most permutations and similarity estimates are skewed
+    a = rng.randint(1, _MERSENNE_PRIME, size=NUM_PERM, dtype=np.uint64)
+    b = rng.randint(0, _MERSENNE_PRIME, size=NUM_PERM, dtype=np.uint64)
+    return a, b, np.uint64(_MERSENNE_PRIME)
+
+
+def minhash(text: str) -> Optional["np.ndarray"]:
+    """
+    64-permutation MinHash signature over content-word bigrams, keeping the low 16
+    bits of each minimum (b-bit MinHash) so a question costs 128 bytes.
+    None for text without words.
+    """
+    import numpy as np
+    shingles = _shingles(text)
+    if not shingles:
+        return None
+    a, b, prime = _permutations()
+    hashes = np.array([zlib.crc32(s.encode("utf-8")) for s in set(shingles)], dtype=np.uint64)
+    # Universal hashing; uint64 overflow is fine, we only need a consistent permutation
+    permuted = (hashes[:, None] * a + b) % prime
+    return (permuted.min(axis=0) & np.uint64(0xFFFF)).astype(np.uint16)
+
+
+class UserQuestions:
+    """
+    Signatures of one user's past questions, one column per question, grown
+    by doubling. Column layout makes the similarity count a reduction over
+    the 64 rows, which is much faster than summing 64 values per question.
+    """
+
+    def __init__(self, capacity: int = 64):
+        import numpy as np
+        self.signatures = np.empty((NUM_PERM, capacity), dtype=np.uint16)
+        self.count = 0
+
+    def add(self, signature: "np.ndarray"):
+        import numpy as np
+        capacity = self.signatures.shape[1]
+        if self.count == capacity:
+            if self.count >= QUESTION_DEDUP_HISTORY:
+                # Full: drop the oldest half
+                keep = self.signatures[:, self.count // 2:self.count].copy()
+                self.signatures[:, :keep.shape[1]] = keep
+                self.count = keep.shape[1]
+            else:
+                grown = np.empty((NUM_PERM, min(capacity * 2, QUESTION_DEDUP_HISTORY)), dtype=np.uint16)
+                grown[:, :self.count] = self.signatures[:, :self.count]
+                self.signatures = grown
+        self.signatures[:, self.count] = signature
+        self.count += 1
+
+    def max_similarity(self, signature: "np.ndarray") -> float:
+        import numpy as np
+        if not self.count:
+            return 0.0
+        matches = np.add.reduce(self.signatures[:, :self.count] == signature[:, None], axis=0, dtype=np.uint8)
+        return matches.max() / NUM_PERM
+
+
+class QuestionIndex:
+    """
+    Per-user MinHash index of asked questions, loaded from the database on
+    first use and kept current by `add`. Used to reject generated questions
+    that are near-duplicates of something the user was already asked.
+    """
+
+    def __init__(self, threshold: float = QUESTION_DEDUP_THRESHOLD, retries: int = QUESTION_DEDUP_RETRIES):
+        self.threshold = threshold
+        self.retries = retries
+        self._users = TTLCache(maxsize=QUESTION_DEDUP_USERS, ttl=QUESTION_DEDUP_TTL)
+
+    async def load(self, user_email: str) -> UserQuestions:
+        index = self._users.get(user_email)
+        if index is not None:
+            return index
+
+        query = (
+            select(interactions_table.c.question)
+            .select_from(interactions_table.join(
+                sessions_table, interactions_table.c.session_id == sessions_table.c.id
+            ))
+            .where(sessions_table.c.user_email == user_email)
+            .order_by(interactions_table.c.id.desc())
+            .limit(QUESTION_DEDUP_HISTORY)
+        )
+        rows = await database.fetch_all(query)
+        index = UserQuestions(capacity=max(64, len(rows)))
+        for row in reversed(rows):
+            signature = minhash(row["question"] or "")
+            if signature is not None:
+                index.add(signature)
+        self._users.set(user_email, index)
+        return index
+
+    def is_duplicate(self, user_email: str, question: str) -> bool:
+        """Check against the user's loaded history (False if it isn't loaded)."""
+        index = self._users.get(user_email)
+        signature = minhash(question)
+        if index is None or signature is None:
+            return False
+        return index.max_similarity(signature) >= self.threshold
+
+    def add(self, user_email: str, question: str):
+        index = self._users.get(user_email)
+        signature = minhash(question)
+        if index is not None and signature is not None:
+            index.add(signature)
+
+    async def generate_distinct(
+        self,
+        user_email: str,
+        generate: Callable[[list[str]], Awaitable[str]]
+    ) -> str:
+        """
+        Call `generate(rejected)` until it returns a question that is not a
+        near-duplicate, at most `retries` extra times; the last candidate is
+        returned if the budget runs out.
+        """
+        await self.load(user_email)
+        rejected = []
+        while True:
+            question = await generate(rejected)
+            if not self.should_regenerate(user_email, question, rejected):
+                return question
+
+    def should_regenerate(self, user_email: str, question: str, rejected: list[str]) -> bool:
+        """True (and `question` appended to `rejected`) if it's a near-duplicate and budget remains."""
+        if len(rejected) >= self.retries or not self.is_duplicate(user_email, question):
+            return False
+        question_duplicates.inc()
+        rejected.append(question)
+        return True
+
+    def stats(self) -> dict:
+        return self._users.stats()
+
+
+question_index = QuestionIndex()
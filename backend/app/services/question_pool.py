@@ -0,0 +1,254 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Optional
+
+from sqlalchemy import select, func
+
+from app.db import database
+from app.models import users_table
+from app.services.cache import TTLCache
+from app.services.llm_client import chat_completion
+from app.services.llm_scheduler import TokenBucket, llm_user
+from app.utils import build_question_messages
+
+logger = logging.getLogger("uvicorn")
+
+QUESTION_POOL_SIZE = int(os.getenv("QUESTION_POOL_SIZE", "5"))
+QUESTION_POOL_REFILL_AT = int(os.getenv("QUESTION_POOL_REFILL_AT", "2"))
+QUESTION_POOL_MAX_KEYS = int(os.getenv("QUESTION_POOL_MAX_KEYS", "200"))
+QUESTION_POOL_TTL = float(os.getenv("QUESTION_POOL_TTL", "86400"))
+QUESTION_POOL_WARM_KEYS = int(os.getenv("QUESTION_POOL_WARM_KEYS", "20"))
+# A key that wasn't warmed gets a pool only after this many misses (most free-text combos never repeat)
+QUESTION_POOL_MIN_MISSES = int(os.getenv("QUESTION_POOL_MIN_MISSES", "3"))
+# Background generations per minute across all pools (not charged to any user's rate limit)
+QUESTION_POOL_REFILLS_PER_MINUTE = float(os.getenv("QUESTION_POOL_REFILLS_PER_MINUTE", "60"))
+# Difficulty isn't stored with the profile, so warmed profiles get a pool per offered difficulty
+QUESTION_POOL_WARM_DIFFICULTIES = [
+    d.strip() for d in os.getenv("QUESTION_POOL_WARM_DIFFICULTIES", "easy,medium,hard").split(",") if d.strip()
+]
+# Seen-question tracking, per user (hashes only)
+SEEN_QUESTIONS_USERS = int(os.getenv("SEEN_QUESTIONS_USERS", "10000"))
+SEEN_QUESTIONS_TTL = float(os.getenv("SEEN_QUESTIONS_TTL", "2592000"))
+
+
+def pool_key(role: str, experience: str, tech_stack: str, difficulty: str) -> tuple:
+    normalize = lambda value: " ".join((value or "").lower().split())
+    return (normalize(role), normalize(experience), normalize(tech_stack), normalize(difficulty))
+
+
+def _question_hash(question: str) -> str:
+    return hashlib.sha1(question.encode("utf-8")).hexdigest()
+
+
+async def _generate_opening_question(raw: dict) -> str:
+    messages = build_question_messages(raw["role"], raw["experience"], raw["tech_stack"], raw["difficulty"])
+    return await chat_completion(messages, model="gpt-3.5-turbo")
+
+
+class QuestionPool:
+    """
+    Bounded per-key pools of pre-generated opening questions, keyed by
+    (role, experience, tech_stack, difficulty). Pools exist for warmed keys
+    and for keys that missed `min_misses` times, and are refilled in the
+    background when they drop to `refill_at`, within a global budget of
+    `refills_per_minute` generations. Least recently used keys are evicted
+    beyond `max_keys`, and questions older than `ttl` are discarded.
+    """
+
+    def __init__(
+        self,
+        size: int = QUESTION_POOL_SIZE,
+        refill_at: int = QUESTION_POOL_REFILL_AT,
+        max_keys: int = QUESTION_POOL_MAX_KEYS,
+        ttl: float = QUESTION_POOL_TTL,
+        min_misses: int = QUESTION_POOL_MIN_MISSES,
+        refills_per_minute: float = QUESTION_POOL_REFILLS_PER_MINUTE,
+        generate=_generate_opening_question
+    ):
+        self.size = size
+        self.refill_at = refill_at
+        self.max_keys = max_keys
+        self.ttl = ttl
+        self.min_misses = min_misses
+        self.generate = generate
+        # Misses of keys without a pool yet, LRU-bounded like the pools
+        self._cold_misses = TTLCache(maxsize=max_keys * 10, ttl=ttl)
+        self._refill_budget = TokenBucket(refills_per_minute / 60, max(1.0, refills_per_minute))
+        self._pools: OrderedDict[tuple, deque] = OrderedDict()
+        self._params: dict[tuple, dict] = {}
+        self._refills: dict[tuple, asyncio.Task] = {}
+        self._seen = TTLCache(maxsize=SEEN_QUESTIONS_USERS, ttl=SEEN_QUESTIONS_TTL)
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.evictions = 0
+        self.throttled = 0
+
+    def _pool(self, key: tuple, raw: dict) -> deque:
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = deque()
+            self._params[key] = raw
+            while len(self._pools) > self.max_keys:
+                evicted, _ = self._pools.popitem(last=False)
+                self._params.pop(evicted, None)
+                self._refills.pop(evicted, None)  # its task stops once it sees the pool is gone
+                self.evictions += 1
+        self._pools.move_to_end(key)
+
+        # Drop expired questions
+        cutoff = time.monotonic() - self.ttl
+        while pool and pool[0][0] < cutoff:
+            pool.popleft()
+        return pool
+
+    def mark_seen(self, user_email: str, question: str):
+        seen = self._seen.get(user_email)
+        if seen is None:
+            seen = set()
+        seen.add(_question_hash(question))
+        self._seen.set(user_email, seen)
+
+    def take(
+        self,
+        user_email: str,
+        role: str,
+        experience: str,
+        tech_stack: str,
+        difficulty: str,
+        reject: Optional[Callable[[str], bool]] = None
+    ) -> Optional[str]:
+        """
+        Pop a pooled question the user has not seen yet (and that `reject`
+        does not refuse), or None on a miss.
+        Either way the pool is topped up in the background if it runs low.
+        """
+        raw = {"role": role, "experience": experience, "tech_stack": tech_stack, "difficulty": difficulty}
+        key = pool_key(role, experience, tech_stack, difficulty)
+        if key not in self._pools:
+            self.misses += 1
+            misses = self._cold_misses.get(key, 0) + 1
+            if misses < self.min_misses:
+                self._cold_misses.set(key, misses)
+                return None
+            # Asked for often enough to be worth keeping questions ready
+            self._cold_misses.invalidate(key)
+            self._pool(key, raw)
+            self.schedule_refill(key)
+            return None
+
+        pool = self._pool(key, raw)
+        seen = self._seen.get(user_email) or set()
+
+        question = None
+        for entry in pool:
+            if _question_hash(entry[1]) not in seen and not (reject and reject(entry[1])):
+                question = entry[1]
+                pool.remove(entry)
+                break
+
+        if question is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.mark_seen(user_email, question)
+
+        if len(pool) <= self.refill_at:
+            self.schedule_refill(key)
+        return question
+
+    def schedule_refill(self, key: tuple):
+        task = self._refills.get(key)
+        if task is None or task.done():
+            self._refills[key] = asyncio.create_task(self._refill(key))
+
+    async def _refill(self, key: tuple):
+        raw = self._params.get(key)
+        if raw is None:
+            return
+        pool = self._pool(key, raw)
+        # Background work: don't charge it to the rate limit of the user who triggered it
+        llm_user.set(None)
+        while self._pools.get(key) is pool and len(pool) < self.size:
+            missing = 0
+            while len(pool) + missing < self.size and self._refill_budget.take():
+                missing += 1
+            if not missing:
+                # Over the global refill budget: wait for it rather than spend more
+                self.throttled += 1
+                await asyncio.sleep(self._refill_budget.wait_time())
+                continue
+
+            results = await asyncio.gather(
+                *(self.generate(raw) for _ in range(missing)),
+                return_exceptions=True
+            )
+            failed = False
+            for question in results:
+                if isinstance(question, BaseException):
+                    logger.warning("Question pool refill failed for %s: %r", key, question)
+                    failed = True
+                elif question and len(pool) < self.size:
+                    pool.append((time.monotonic(), question))
+                    self.generated += 1
+            if failed:
+                return  # retried on the next take that finds the pool low
+
+    def warm(self, combos: list[dict]):
+        """Start background refills for the given role/experience/tech_stack/difficulty combos."""
+        for raw in combos:
+            key = pool_key(raw["role"], raw["experience"], raw["tech_stack"], raw["difficulty"])
+            self._pool(key, raw)
+            self.schedule_refill(key)
+
+    async def warm_from_profiles(
+        self,
+        limit: int = QUESTION_POOL_WARM_KEYS,
+        difficulties: list[str] = QUESTION_POOL_WARM_DIFFICULTIES
+    ):
+        """Warm the most common role/experience/tech_stack profiles of existing users, at each difficulty."""
+        count = func.count().label("n")
+        query = (
+            select(users_table.c.role, users_table.c.experience, users_table.c.tech_stack, count)
+            .where(users_table.c.role.isnot(None))
+            .group_by(users_table.c.role, users_table.c.experience, users_table.c.tech_stack)
+            .order_by(count.desc())
+            .limit(limit)
+        )
+        rows = await database.fetch_all(query)
+        self.warm([
+            {
+                "role": row["role"],
+                "experience": row["experience"],
+                "tech_stack": row["tech_stack"],
+                "difficulty": difficulty
+            }
+            for row in rows
+            for difficulty in difficulties
+        ])
+
+    async def stop(self):
+        for task in self._refills.values():
+            task.cancel()
+        await asyncio.gather(*self._refills.values(), return_exceptions=True)
+        self._refills.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "keys": len(self._pools),
+            "questions": sum(len(pool) for pool in self._pools.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "generated": self.generated,
+            "evictions": self.evictions,
+            "throttled_refills": self.throttled
+        }
+
+
+question_pool = QuestionPool()
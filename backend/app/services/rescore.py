@@ -0,0 +1,567 @@
+"""
+Bulk re-scoring of answered interactions, for when the grading prompt or the
+skill list changes.
+
+    feedback  re-grade every answer (feedback and score); answers run concurrently
+    skills    rebuild each user's skill history by replaying their answers in
+              order (sequential per user, users run concurrently); a user
+              who was active during their replay is left for the next run
+
+Work is streamed from the read database in keyset chunks, each read through a
+server-side cursor. Results are written back in batched transactions that also
+store a checkpoint in batch_jobs, so an interrupted job resumes where it
+stopped. Items whose scoring failed are recorded with the checkpoint and
+retried first when the job is resumed. LLM calls go through llm_scheduler and are further held to a QPS
+limit and a token budget for the run.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import case, func, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.constants import skills
+from app.db import database, read_database
+from app.models import (
+    batch_jobs_table,
+    interactions_table,
+    sessions_table,
+    session_summaries_table,
+    users_table,
+    user_skills_table,
+    user_skill_history_table,
+    user_skill_rollups_table
+)
+from app.services.llm_client import llm_usage
+from app.services.llm_scheduler import LLMRateLimited, LLMUnavailable, TokenBucket, llm_user
+from app.services.skill_progress import aggregate_rollups
+from app.utils import extract_skill_scores, generate_feedback
+
+logger = logging.getLogger("uvicorn")
+
+RESCORE_CONCURRENCY = int(os.getenv("RESCORE_CONCURRENCY", "4"))
+RESCORE_QPS = float(os.getenv("RESCORE_QPS", "2"))
+# Tokens one run may spend before it pauses (0 = no limit)
+RESCORE_MAX_TOKENS = int(os.getenv("RESCORE_MAX_TOKENS", "0"))
+RESCORE_BATCH_SIZE = int(os.getenv("RESCORE_BATCH_SIZE", "50"))
+# Rows per keyset chunk; each chunk is one server-side cursor (and one short read transaction)
+RESCORE_CHUNK_SIZE = 500
+# A batch is written once it is this old even if not full
+RESCORE_FLUSH_INTERVAL = 5.0
+# A "running" job whose checkpoint was not touched for this long is considered dead and can be taken over
+RESCORE_STALE_AFTER = 300
+# Seconds after an answer during which its (possibly deferred) skill write may still be in flight
+RESCORE_SKILL_SETTLE = 120
+
+SCOPES = ("feedback", "skills")
+INSERT_CHUNK = 5000
+
+
+class JobConflict(Exception):
+    """The job is already running (here or in another process)."""
+
+
+class _Abandoned(Exception):
+    """Work item given up because the job is stopping; it is redone on resume."""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _naive_utc(value: datetime) -> datetime:
+    # Answer and skill times are written as naive UTC and may come back timezone-aware
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+class RescoreJob:
+    def __init__(
+        self,
+        scope: str,
+        name: Optional[str] = None,
+        concurrency: int = RESCORE_CONCURRENCY,
+        qps: float = RESCORE_QPS,
+        max_tokens: int = RESCORE_MAX_TOKENS,
+        batch_size: int = RESCORE_BATCH_SIZE,
+        user_email: Optional[str] = None
+    ):
+        if scope not in SCOPES:
+            raise ValueError(f"Unknown scope {scope!r}, expected one of {', '.join(SCOPES)}")
+        self.scope = scope
+        self.name = name or f"rescore-{scope}"
+        self.concurrency = concurrency
+        self.qps = qps
+        self.max_tokens = max_tokens
+        self.batch_size = batch_size
+        self.user_email = user_email
+
+        self.status = "pending"
+        self.stop_reason: Optional[str] = None
+        self.cursor: Optional[str] = None
+        self.processed = 0
+        self.failed = 0
+        self.usage = {"prompt_tokens": 0, "completion_tokens": 0}
+        self._saved_usage = dict(self.usage)
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        self._stopping = False
+        self._bucket = TokenBucket(qps, max(1.0, qps)) if qps > 0 else None
+        # Keys in dispatch order; the checkpoint only moves past keys whose results are written
+        self._dispatched: deque = deque()
+        self._done: set = set()
+        # Keys that failed (in this or an earlier run) and keys being retried from before the checkpoint
+        self.failed_keys: set = set()
+        self._retrying: set = set()
+
+    # --- lifecycle -------------------------------------------------------
+
+    async def claim(self, restart: bool = False):
+        """Mark the job running in batch_jobs and load its checkpoint (unless `restart`)."""
+        now = _now()
+        claimed = await database.fetch_val(
+            pg_insert(batch_jobs_table)
+            .values(name=self.name, kind=self.scope, status="running", processed=0, failed=0,
+                    prompt_tokens=0, completion_tokens=0, started_at=now, updated_at=now)
+            .on_conflict_do_nothing(index_elements=["name"])
+            .returning(batch_jobs_table.c.name)
+        )
+        if claimed is None:
+            values = {"status": "running", "updated_at": now}
+            if restart:
+                values.update(
+                    cursor=None, failed_keys=None, processed=0, failed=0,
+                    prompt_tokens=0, completion_tokens=0, started_at=now
+                )
+            claimed = await database.fetch_val(
+                batch_jobs_table.update()
+                .where(batch_jobs_table.c.name == self.name)
+                .where(batch_jobs_table.c.kind == self.scope)
+                .where(or_(
+                    batch_jobs_table.c.status != "running",
+                    batch_jobs_table.c.updated_at < now - timedelta(seconds=RESCORE_STALE_AFTER)
+                ))
+                .values(**values)
+                .returning(batch_jobs_table.c.name)
+            )
+            if claimed is None:
+                raise JobConflict(f"Job {self.name!r} is already running or is not a {self.scope} job")
+        row = await database.fetch_one(batch_jobs_table.select().where(batch_jobs_table.c.name == self.name))
+        self.cursor = row["cursor"]
+        self.failed_keys = set(json.loads(row["failed_keys"] or "[]"))
+        self.status = "running"
+
+    def stop(self, reason: str = "stopped"):
+        """Stop dispatching work; in-flight items finish (or are left for the next run) and are checkpointed."""
+        if not self._stopping:
+            self._stopping = True
+            self.stop_reason = reason
+
+    async def run(self):
+        """Run a claimed job to completion (status "done") or until stopped (status "paused")."""
+        # Batch work is not charged to whoever started it, and its tokens are tallied here
+        llm_user.set(None)
+        llm_usage.set(self.usage)
+        self._started = time.monotonic()
+
+        items = asyncio.Queue(maxsize=self.concurrency * 2)
+        results = asyncio.Queue()
+        producer = asyncio.ensure_future(self._produce(items))
+        workers = [asyncio.ensure_future(self._work(items, results)) for _ in range(self.concurrency)]
+        writer = asyncio.ensure_future(self._write(results))
+        tasks = [producer, *workers, writer]
+        try:
+            await producer
+            for _ in workers:
+                await items.put(None)
+            await asyncio.gather(*workers)
+            await results.put(None)
+            await writer
+            self.status = "paused" if self._stopping else "done"
+        except BaseException:
+            self.status = "failed"
+            for task in tasks:
+                task.cancel()
+            raise
+        finally:
+            self._finished = time.monotonic()
+            await self._checkpoint()
+
+    # --- pipeline --------------------------------------------------------
+
+    def _items_query(self, after: Optional[str] = None, keys: Optional[list[str]] = None):
+        """Items after the keyset position `after`, or exactly the items `keys`, in key order."""
+        if self.scope == "feedback":
+            query = (
+                select(
+                    interactions_table.c.id,
+                    interactions_table.c.session_id,
+                    interactions_table.c.question,
+                    interactions_table.c.answer,
+                    interactions_table.c.score,
+                )
+                .where(interactions_table.c.answer.isnot(None))
+                .order_by(interactions_table.c.id)
+            )
+            if after is not None:
+                query = query.where(interactions_table.c.id > int(after))
+            if keys is not None:
+                query = query.where(interactions_table.c.id.in_([int(key) for key in keys]))
+            if self.user_email:
+                query = query.where(interactions_table.c.session_id.in_(
+                    select(sessions_table.c.id).where(sessions_table.c.user_email == self.user_email)
+                ))
+        else:
+            query = (
+                select(sessions_table.c.user_email)
+                .select_from(sessions_table.join(interactions_table, interactions_table.c.session_id == sessions_table.c.id))
+                .where(interactions_table.c.answer.isnot(None))
+                .group_by(sessions_table.c.user_email)
+                .order_by(sessions_table.c.user_email)
+            )
+            if after is not None:
+                query = query.where(sessions_table.c.user_email > after)
+            if keys is not None:
+                query = query.where(sessions_table.c.user_email.in_(keys))
+            if self.user_email:
+                query = query.where(sessions_table.c.user_email == self.user_email)
+        return query.limit(RESCORE_CHUNK_SIZE)
+
+    def _key(self, row) -> str:
+        return str(row["id"]) if self.scope == "feedback" else row["user_email"]
+
+    def _sort_key(self, key: str):
+        return int(key) if self.scope == "feedback" else key
+
+    async def _fetch(self, query) -> list:
+        # Drain the chunk before dispatching it, so the read transaction is not
+        # held open for the minutes its LLM calls take
+        chunk = []
+        rows = read_database.iterate(query)
+        try:
+            async for row in rows:
+                chunk.append(row)
+        finally:
+            await rows.aclose()
+        return chunk
+
+    async def _produce(self, items: asyncio.Queue):
+        # Earlier failures behind the checkpoint first; those past it come up again in the main pass
+        retry = sorted(
+            (key for key in self.failed_keys
+             if self.cursor is not None and self._sort_key(key) <= self._sort_key(self.cursor)),
+            key=self._sort_key
+        )
+        for i in range(0, len(retry), RESCORE_CHUNK_SIZE):
+            for row in await self._fetch(self._items_query(keys=retry[i:i + RESCORE_CHUNK_SIZE])):
+                if self._stopping:
+                    return
+                self._retrying.add(self._key(row))
+                await items.put(row)
+
+        after = self.cursor
+        while not self._stopping:
+            chunk = await self._fetch(self._items_query(after))
+            for row in chunk:
+                if self._stopping:
+                    return
+                after = self._key(row)
+                self._dispatched.append(after)
+                await items.put(row)
+            if len(chunk) < RESCORE_CHUNK_SIZE:
+                return
+
+    async def _work(self, items: asyncio.Queue, results: asyncio.Queue):
+        while True:
+            row = await items.get()
+            if row is None:
+                return
+            if self._stopping:
+                continue  # left undone, so the checkpoint stays before it
+            key = self._key(row)
+            try:
+                if self.scope == "feedback":
+                    result = await self._regrade(row)
+                else:
+                    result = await self._replay_skills(row["user_email"])
+            except _Abandoned:
+                continue
+            except Exception as e:
+                logger.warning("Re-scoring %s %s failed: %r", self.scope, key, e)
+                result = None
+            await results.put((key, result))
+
+    def _over_budget(self) -> bool:
+        if self.max_tokens and self.usage["prompt_tokens"] + self.usage["completion_tokens"] >= self.max_tokens:
+            self.stop("token budget")
+        return self._stopping
+
+    async def _llm(self, call):
+        """Make one LLM call within the QPS limit and token budget, waiting out shed load."""
+        while True:
+            if self._over_budget():
+                raise _Abandoned()
+            if self._bucket is not None:
+                while not self._bucket.take():
+                    await asyncio.sleep(self._bucket.wait_time())
+            try:
+                return await call()
+            except (LLMUnavailable, LLMRateLimited) as e:
+                await asyncio.sleep(e.retry_after or 1)
+
+    async def _regrade(self, row) -> dict:
+        # Uncached: a cached grade would predate the prompt change, and a bulk run
+        # would evict live entries with ones no request asks for again
+        feedback, score = await self._llm(lambda: generate_feedback(row["question"], row["answer"], cache=False))
+        return {
+            "id": row["id"],
+            "session_id": row["session_id"],
+            "old_score": row["score"],
+            "feedback": feedback,
+            "score": score,
+        }
+
+    async def _replay_skills(self, user_email: str) -> dict:
+        # Same clock as the answer and skill writes this is checked against in _save_skills
+        read_at = datetime.utcnow()
+        # Answers from before answered_at existed are dated by their question
+        answered_at = func.coalesce(interactions_table.c.answered_at, interactions_table.c.timestamp).label("timestamp")
+        answers = await database.fetch_all(
+            select(interactions_table.c.answer, answered_at)
+            .select_from(interactions_table.join(sessions_table, interactions_table.c.session_id == sessions_table.c.id))
+            .where(sessions_table.c.user_email == user_email)
+            .where(interactions_table.c.answer.isnot(None))
+            .order_by(answered_at, interactions_table.c.id)
+        )
+        scores = {skill: 0.0 for skill in skills}
+        history = []
+        for answer in answers:
+            updated = await self._llm(lambda: extract_skill_scores(answer["answer"], dict(scores), cache=False))
+            scores.update(updated)
+            history.extend((user_email, skill, score, answer["timestamp"]) for skill, score in updated.items())
+        return {"user_email": user_email, "history": history, "scores": scores, "read_at": read_at}
+
+    async def _write(self, results: asyncio.Queue):
+        batch, first_at, last_write = [], None, time.monotonic()
+        while True:
+            timeout = RESCORE_FLUSH_INTERVAL if first_at is None else max(0.0, first_at + RESCORE_FLUSH_INTERVAL - time.monotonic())
+            try:
+                item = await asyncio.wait_for(results.get(), timeout)
+            except asyncio.TimeoutError:
+                item = False
+            if item is None:
+                break
+            if item:
+                batch.append(item)
+                first_at = first_at or time.monotonic()
+            if batch and (len(batch) >= self.batch_size or time.monotonic() - first_at >= RESCORE_FLUSH_INTERVAL):
+                await self._flush(batch)
+                batch, first_at, last_write = [], None, time.monotonic()
+            elif time.monotonic() - last_write > RESCORE_STALE_AFTER / 5:
+                # Long items (a user's whole history): keep the job from looking dead
+                await self._checkpoint()
+                last_write = time.monotonic()
+        if batch:
+            await self._flush(batch)
+
+    async def _flush(self, batch: list):
+        async with database.transaction():
+            if self.scope == "skills":
+                # Users active since their replay keep their rows and count as failed (retried on resume)
+                busy = await self._busy_users([result for _, result in batch if result is not None])
+                batch = [(key, None if key in busy else result) for key, result in batch]
+            done = [result for _, result in batch if result is not None]
+            if done and self.scope == "feedback":
+                await self._save_grades(done)
+            elif done:
+                await self._save_skills(done)
+            for key, result in batch:
+                if result is None:
+                    self.failed_keys.add(key)
+                else:
+                    self.failed_keys.discard(key)
+                if key in self._retrying:
+                    self._retrying.discard(key)
+                else:
+                    self._done.add(key)
+            self._advance()
+            await self._checkpoint(processed=len(done))
+        self.processed += len(done)
+        self.failed += len(batch) - len(done)
+
+    def _advance(self):
+        while self._dispatched and self._dispatched[0] in self._done:
+            self.cursor = self._dispatched.popleft()
+            self._done.discard(self.cursor)
+
+    async def _save_grades(self, grades: list[dict]):
+        ids = [g["id"] for g in grades]
+        await database.execute(
+            interactions_table.update()
+            .where(interactions_table.c.id.in_(ids))
+            .values(
+                feedback=case({g["id"]: g["feedback"] for g in grades}, value=interactions_table.c.id),
+                score=case({g["id"]: g["score"] for g in grades}, value=interactions_table.c.id),
+            )
+        )
+
+        # Keep the session list's averages in step with the new scores
+        score_delta, scored_delta = defaultdict(int), defaultdict(int)
+        for g in grades:
+            score_delta[g["session_id"]] += (g["score"] or 0) - (g["old_score"] or 0)
+            scored_delta[g["session_id"]] += (g["score"] is not None) - (g["old_score"] is not None)
+        sessions = [s for s in score_delta if score_delta[s] or scored_delta[s]]
+        if sessions:
+            session_id = session_summaries_table.c.session_id
+            await database.execute(
+                session_summaries_table.update()
+                .where(session_id.in_(sessions))
+                .values(
+                    score_total=session_summaries_table.c.score_total
+                    + case({s: score_delta[s] for s in sessions}, value=session_id, else_=0),
+                    scored_count=session_summaries_table.c.scored_count
+                    + case({s: scored_delta[s] for s in sessions}, value=session_id, else_=0),
+                )
+            )
+
+    async def _busy_users(self, users: list[dict]) -> set[str]:
+        """
+        Lock the users' rows against live skill writes (save_skill_scores share-locks
+        them) for the rest of the transaction, and return those whose replay is out
+        of date: an answer or skill write since it read their answers, or an answer
+        recent enough that its skill write may still land.
+        """
+        if not users:
+            return set()
+        emails = sorted(u["user_email"] for u in users)
+        await database.fetch_all(
+            select(users_table.c.email).where(users_table.c.email.in_(emails)).order_by(users_table.c.email).with_for_update()
+        )
+        busy = set()
+        for u in users:
+            email, read_at = u["user_email"], u["read_at"]
+            answered = await database.fetch_val(
+                select(func.max(interactions_table.c.answered_at))
+                .select_from(interactions_table.join(sessions_table, interactions_table.c.session_id == sessions_table.c.id))
+                .where(sessions_table.c.user_email == email)
+            )
+            written = await database.fetch_val(
+                select(func.max(user_skill_history_table.c.timestamp))
+                .where(user_skill_history_table.c.user_email == email)
+            )
+            settled = read_at - timedelta(seconds=RESCORE_SKILL_SETTLE)
+            if (answered is not None and _naive_utc(answered) > settled) or \
+                    (written is not None and _naive_utc(written) > read_at):
+                busy.add(email)
+        if busy:
+            logger.info("Skills re-scoring: %d users were active during their replay, left for the next run", len(busy))
+        return busy
+
+    async def _save_skills(self, users: list[dict]):
+        emails = [u["user_email"] for u in users]
+        now = _now()
+        history = [entry for u in users for entry in u["history"]]
+        history_rows = [
+            {"user_email": email, "skill_name": skill, "score": score, "timestamp": ts}
+            for email, skill, score, ts in history
+        ]
+        snapshot_rows = [
+            {"user_email": u["user_email"], "skill_name": skill, "score": score, "updated_at": now}
+            for u in users
+            for skill, score in u["scores"].items()
+        ]
+        rollup_rows = aggregate_rollups(history)
+
+        for table in (user_skill_history_table, user_skills_table, user_skill_rollups_table):
+            await database.execute(table.delete().where(table.c.user_email.in_(emails)))
+        for table, rows in (
+            (user_skill_history_table, history_rows),
+            (user_skills_table, snapshot_rows),
+            (user_skill_rollups_table, rollup_rows),
+        ):
+            for i in range(0, len(rows), INSERT_CHUNK):
+                await database.execute(table.insert().values(rows[i:i + INSERT_CHUNK]))
+
+    async def _checkpoint(self, processed: int = 0):
+        tokens = {key: self.usage[key] - self._saved_usage[key] for key in self.usage}
+        self._saved_usage = dict(self.usage)
+        await database.execute(
+            batch_jobs_table.update()
+            .where(batch_jobs_table.c.name == self.name)
+            .values(
+                cursor=self.cursor,
+                failed_keys=json.dumps(sorted(self.failed_keys, key=self._sort_key)) if self.failed_keys else None,
+                status=self.status,
+                processed=batch_jobs_table.c.processed + processed,
+                failed=len(self.failed_keys),
+                prompt_tokens=batch_jobs_table.c.prompt_tokens + tokens["prompt_tokens"],
+                completion_tokens=batch_jobs_table.c.completion_tokens + tokens["completion_tokens"],
+                updated_at=_now(),
+            )
+        )
+
+    # --- reporting -------------------------------------------------------
+
+    def progress(self) -> dict:
+        """This run's progress and throughput."""
+        elapsed = ((self._finished or time.monotonic()) - self._started) if self._started else 0.0
+        tokens = self.usage["prompt_tokens"] + self.usage["completion_tokens"]
+        return {
+            "name": self.name,
+            "scope": self.scope,
+            "status": self.status,
+            "stop_reason": self.stop_reason,
+            "cursor": self.cursor,
+            "processed": self.processed,
+            "failed": self.failed,
+            "failed_total": len(self.failed_keys),
+            **self.usage,
+            "elapsed_seconds": round(elapsed, 1),
+            "per_second": round(self.processed / elapsed, 2) if elapsed else 0.0,
+            "tokens_per_second": round(tokens / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+async def fetch_job(name: str) -> Optional[dict]:
+    row = await database.fetch_one(batch_jobs_table.select().where(batch_jobs_table.c.name == name))
+    if row is None:
+        return None
+    return {
+        **dict(row),
+        "failed_keys": json.loads(row["failed_keys"] or "[]"),
+        "started_at": row["started_at"].isoformat() if row["started_at"] else None,
+        "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None,
+    }
+
+
+# Jobs started through the admin endpoint in this process, by name
+running_jobs: dict[str, RescoreJob] = {}
+_job_tasks: set = set()
+
+
+def start_in_background(job: RescoreJob):
+    """Run a claimed job as a background task of this process."""
+    async def run():
+        try:
+            await job.run()
+            logger.info("Re-scoring job %s %s: %s", job.name, job.status, job.progress())
+        except Exception:
+            logger.exception("Re-scoring job %s failed", job.name)
+
+    running_jobs[job.name] = job
+    task = asyncio.ensure_future(run())
+    _job_tasks.add(task)
+    task.add_done_callback(_job_tasks.discard)
+
+
+async def stop_jobs():
+    """Stop background jobs at shutdown; each writes its checkpoint and resumes when started again."""
+    for job in running_jobs.values():
+        job.stop("shutdown")
+    if _job_tasks:
+        await asyncio.gather(*_job_tasks, return_exceptions=True)
@@ -0,0 +1,108 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select, func, insert, inspect
+
+from app.db import database
+from app.models import interactions_table, sessions_table, session_summaries_table
+
+def summary_values(session_id: str, user_email: Optional[str], created_at: datetime) -> dict:
+    return {
+        "session_id": session_id,
+        "user_email": user_email,
+        "created_at": created_at,
+        "question_count": 0,
+        "answered_count": 0,
+        "score_total": 0,
+        "scored_count": 0,
+        "last_activity_at": created_at,
+    }
+
+
+async def record_question(session_id: str, timestamp: datetime):
+    await database.execute(
+        session_summaries_table.update()
+        .where(session_summaries_table.c.session_id == session_id)
+        .values(
+            question_count=session_summaries_table.c.question_count + 1,
+            last_activity_at=timestamp
+        )
+    )
+
+
+async def record_answer(session_id: str, previous, score: Optional[int], timestamp: datetime):
+    """
+    Fold an answer into the counters. `previous` is the interaction row before
+    the update, so re-answering the same question replaces its score instead
+    of counting it twice.
+    """
+    was_answered = previous["answer"] is not None
+    previous_score = previous["score"]
+    await database.execute(
+        session_summaries_table.update()
+        .where(session_summaries_table.c.session_id == session_id)
+        .values(
+            answered_count=session_summaries_table.c.answered_count + (0 if was_answered else 1),
+            score_total=session_summaries_table.c.score_total + (score or 0) - (previous_score or 0),
+            scored_count=session_summaries_table.c.scored_count
+            + (score is not None) - (previous_score is not None),
+            last_activity_at=timestamp
+        )
+    )
+
+
+def serialize_summary(row) -> dict:
+    return {
+        "id": row["session_id"],
+        "user_email": row["user_email"],
+        "created_at": row["created_at"].isoformat() if row["created_at"] else None,
+        "question_count": row["question_count"],
+        "answered_count": row["answered_count"],
+        "average_score": (
+            round(row["score_total"] / row["scored_count"], 1) if row["scored_count"] else None
+        ),
+        "last_activity_at": row["last_activity_at"].isoformat() if row["last_activity_at"] else None,
+    }
+
+
+def rebuild_session_summaries(conn) -> int:
+    """
+    Recompute every summary from sessions + interactions (sync, for migrations
+    and the backfill command). Returns the number of sessions summarized.
+    last_activity_at is the latest answer or question time, as on the live path.
+    """
+    activity = interactions_table.c.timestamp
+    # Migration 5 runs this before migration 10 adds answered_at
+    if "answered_at" in {c["name"] for c in inspect(conn).get_columns("interactions")}:
+        activity = func.coalesce(interactions_table.c.answered_at, interactions_table.c.timestamp)
+    counts = (
+        select(
+            interactions_table.c.session_id,
+            func.count().label("question_count"),
+            func.count(interactions_table.c.answer).label("answered_count"),
+            func.coalesce(func.sum(interactions_table.c.score), 0).label("score_total"),
+            func.count(interactions_table.c.score).label("scored_count"),
+            func.max(activity).label("last_activity_at"),
+        )
+        .group_by(interactions_table.c.session_id)
+        .subquery()
+    )
+    rows = select(
+        sessions_table.c.id,
+        sessions_table.c.user_email,
+        sessions_table.c.created_at,
+        func.coalesce(counts.c.question_count, 0),
+        func.coalesce(counts.c.answered_count, 0),
+        func.coalesce(counts.c.score_total, 0),
+        func.coalesce(counts.c.scored_count, 0),
+        func.coalesce(counts.c.last_activity_at, sessions_table.c.created_at),
+    ).select_from(
+        sessions_table.outerjoin(counts, counts.c.session_id == sessions_table.c.id)
+    )
+
+    conn.execute(session_summaries_table.delete())
+    conn.execute(insert(session_summaries_table).from_select([
+        "session_id", "user_email", "created_at", "question_count",
+        "answered_count", "score_total", "scored_count", "last_activity_at",
+    ], rows))
+    return conn.execute(select(func.count()).select_from(session_summaries_table)).scalar()
@@ -0,0 +1,57 @@
+import asyncio
+from typing import Any, Awaitable, Callable
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller (the
+    leader) does the work, later callers await the leader's result.
+    The shared work keeps running if a waiting client disconnects, so a
+    retry can pick up its stored result instead of starting over.
+    """
+
+    def __init__(self):
+        self._calls: dict[str, asyncio.Future] = {}
+        self.coalesced = 0
+
+    def join(self, key: str) -> tuple[asyncio.Future, bool]:
+        """Return (future, is_leader). The leader must call `finish` exactly once."""
+        future = self._calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return future, False
+        future = asyncio.get_running_loop().create_future()
+        # Nobody may be waiting when it fails; don't warn about unretrieved exceptions
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._calls[key] = future
+        return future, True
+
+    def finish(self, key: str, result: Any = None, error: BaseException = None):
+        future = self._calls.pop(key, None)
+        if future is None or future.done():
+            return
+        if isinstance(error, asyncio.CancelledError):
+            # Waiters were not cancelled themselves; give them an ordinary error
+            future.set_exception(RuntimeError("The original request was cancelled"))
+        elif error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `factory()` once per key at a time and share its result."""
+        future, leader = self.join(key)
+        if leader:
+            task = asyncio.ensure_future(factory())
+            task.add_done_callback(lambda t: self.finish(
+                key,
+                error=asyncio.CancelledError() if t.cancelled() else t.exception(),
+                result=None if t.cancelled() or t.exception() else t.result()
+            ))
+        return await asyncio.shield(future)
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._calls), "coalesced": self.coalesced}
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,172 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.db import database
+from app.models import user_skill_history_table, user_skill_rollups_table
+
+if TYPE_CHECKING:
+    import numpy as np
+
+PERIODS = ("day", "week")
+
+
+def bucket_start(timestamp: datetime, period: str) -> datetime:
+    day = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == "week":
+        return day - timedelta(days=day.weekday())  # weeks start on Monday
+    return day
+
+
+def rollup_upsert(user_email: str, skill_scores: dict[str, float], timestamp: datetime):
+    """Statement adding one answer's scores to its day and week buckets."""
+    rows = [
+        {
+            "user_email": user_email,
+            "period": period,
+            "skill_name": skill,
+            "bucket_start": bucket_start(timestamp, period),
+            "score_total": score,
+            "score_count": 1,
+        }
+        for period in PERIODS
+        for skill, score in skill_scores.items()
+    ]
+    upsert = pg_insert(user_skill_rollups_table).values(rows)
+    return upsert.on_conflict_do_update(
+        index_elements=["user_email", "period", "skill_name", "bucket_start"],
+        set_={
+            "score_total": user_skill_rollups_table.c.score_total + upsert.excluded.score_total,
+            "score_count": user_skill_rollups_table.c.score_count + upsert.excluded.score_count,
+        }
+    )
+
+
+def aggregate_rollups(history) -> list[dict]:
+    """
+    Rollup rows for (user_email, skill_name, score, timestamp) history entries.
+    Memory is bounded by the number of buckets rather than history rows.
+    """
+    totals = defaultdict(lambda: [0.0, 0])
+    for user_email, skill_name, score, timestamp in history:
+        if score is None or timestamp is None:
+            continue
+        for period in PERIODS:
+            entry = totals[(user_email, period, skill_name, bucket_start(timestamp, period))]
+            entry[0] += score
+            entry[1] += 1
+    return [
+        {
+            "user_email": user_email,
+            "period": period,
+            "skill_name": skill_name,
+            "bucket_start": start,
+            "score_total": total,
+            "score_count": count,
+        }
+        for (user_email, period, skill_name, start), (total, count) in totals.items()
+    ]
+
+
+def rebuild_skill_rollups(conn, batch_size: int = 5000) -> int:
+    """
+    Recompute the rollups from user_skill_history (sync, for migrations),
+    streaming the history. Returns the rollup row count.
+    """
+    history = conn.execution_options(yield_per=batch_size).execute(select(
+        user_skill_history_table.c.user_email,
+        user_skill_history_table.c.skill_name,
+        user_skill_history_table.c.score,
+        user_skill_history_table.c.timestamp,
+    ))
+    rows = aggregate_rollups(history)
+
+    conn.execute(user_skill_rollups_table.delete())
+    for i in range(0, len(rows), batch_size):
+        conn.execute(user_skill_rollups_table.insert(), rows[i:i + batch_size])
+    return len(rows)
+
+
+def lttb(x: "np.ndarray", y: "np.ndarray", threshold: int) -> "np.ndarray":
+    """
+    Largest-Triangle-Three-Buckets downsampling. Returns the indices of the
+    points to keep; always keeps the first and last point.
+    """
+    import numpy as np
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    keep = np.empty(threshold, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third corner of the triangle
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        areas = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(areas.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+async def fetch_skill_progress(
+    user_email: str,
+    period: str = "day",
+    points: Optional[int] = None,
+    since: Optional[datetime] = None
+) -> dict[str, list[dict]]:
+    """Per-skill series of bucket averages, optionally LTTB-downsampled to `points` each."""
+    import numpy as np
+    query = (
+        select(
+            user_skill_rollups_table.c.skill_name,
+            user_skill_rollups_table.c.bucket_start,
+            user_skill_rollups_table.c.score_total,
+            user_skill_rollups_table.c.score_count,
+        )
+        .where(user_skill_rollups_table.c.user_email == user_email)
+        .where(user_skill_rollups_table.c.period == period)
+        .order_by(user_skill_rollups_table.c.skill_name, user_skill_rollups_table.c.bucket_start)
+    )
+    if since:
+        query = query.where(user_skill_rollups_table.c.bucket_start >= bucket_start(since, period))
+    rows = await database.fetch_all(query)
+
+    by_skill = defaultdict(list)
+    for row in rows:
+        by_skill[row["skill_name"]].append(row)
+
+    series = {}
+    for skill, skill_rows in by_skill.items():
+        starts = [row["bucket_start"] for row in skill_rows]
+        totals = np.array([row["score_total"] for row in skill_rows], dtype=float)
+        counts = np.array([row["score_count"] for row in skill_rows], dtype=float)
+        averages = totals / np.maximum(counts, 1)
+
+        keep = np.arange(len(starts))
+        if points:
+            x = np.array([start.timestamp() for start in starts])
+            keep = lttb(x, averages, points)
+
+        series[skill] = [
+            {
+                "t": starts[i].isoformat(),
+                "score": round(float(averages[i]), 2),
+                "count": int(counts[i]),
+            }
+            for i in keep
+        ]
+    return series
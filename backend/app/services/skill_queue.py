@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from typing import Optional
+
+from app.services.feedback_pipeline import score_and_save_skills
+
+logger = logging.getLogger("uvicorn")
+
+SKILL_QUEUE_MAXSIZE = int(os.getenv("SKILL_QUEUE_MAXSIZE", "100"))
+SKILL_QUEUE_WORKERS = int(os.getenv("SKILL_QUEUE_WORKERS", "2"))
+SKILL_QUEUE_RETRIES = int(os.getenv("SKILL_QUEUE_RETRIES", "2"))
+SKILL_QUEUE_RETRY_DELAY = float(os.getenv("SKILL_QUEUE_RETRY_DELAY", "1"))
+# How many finished results are kept around for polling
+SKILL_RESULTS_MAX = int(os.getenv("SKILL_RESULTS_MAX", "1000"))
+
+
+class SkillScoringQueue:
+    """
+    In-process async work queue for deferred skill scoring.
+    Jobs are keyed by interaction id; results stay pollable until evicted
+    (oldest first) once more than `max_results` are stored.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = SKILL_QUEUE_MAXSIZE,
+        workers: int = SKILL_QUEUE_WORKERS,
+        retries: int = SKILL_QUEUE_RETRIES,
+        retry_delay: float = SKILL_QUEUE_RETRY_DELAY,
+        max_results: int = SKILL_RESULTS_MAX
+    ):
+        self.maxsize = maxsize
+        self.workers = workers
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.max_results = max_results
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list[asyncio.Task] = []
+        self._results: OrderedDict[int, dict] = OrderedDict()
+        self._finished: dict[int, asyncio.Event] = {}
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, interaction_id: int, user_email: str, answer: str) -> bool:
+        """Queue a job. Returns False if the queue is full or not running."""
+        if self._queue is None:
+            return False
+        try:
+            self._queue.put_nowait((interaction_id, user_email, answer))
+        except asyncio.QueueFull:
+            return False
+        self._store(interaction_id, {"status": "pending", "user_email": user_email, "skills": None})
+        return True
+
+    def get(self, interaction_id: int) -> Optional[dict]:
+        return self._results.get(interaction_id)
+
+    async def wait(self, interaction_id: int, timeout: Optional[float] = None) -> Optional[dict]:
+        """Wait until a pending job is done or failed (or `timeout` passes) and return its result."""
+        result = self.get(interaction_id)
+        if result is None or result["status"] != "pending":
+            return result
+        finished = self._finished.setdefault(interaction_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(finished.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.get(interaction_id)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "results": len(self._results)
+        }
+
+    def _store(self, interaction_id: int, result: dict):
+        self._results[interaction_id] = result
+        self._results.move_to_end(interaction_id)
+        while len(self._results) > self.max_results:
+            self._results.popitem(last=False)
+        if result["status"] != "pending" and interaction_id in self._finished:
+            self._finished.pop(interaction_id).set()
+
+    async def _worker(self):
+        while True:
+            interaction_id, user_email, answer = await self._queue.get()
+            try:
+                await self._run(interaction_id, user_email, answer)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, interaction_id: int, user_email: str, answer: str):
+        for attempt in range(self.retries + 1):
+            try:
+                skills = await score_and_save_skills(user_email, answer)
+                self._store(interaction_id, {"status": "done", "user_email": user_email, "skills": skills})
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(
+                    "Skill scoring failed for interaction %s (attempt %d): %r",
+                    interaction_id, attempt + 1, e
+                )
+                if attempt < self.retries:
+                    await asyncio.sleep(self.retry_delay * (2 ** attempt))
+        self._store(interaction_id, {"status": "failed", "user_email": user_email, "skills": None})
+
+
+skill_queue = SkillScoringQueue()
@@ -0,0 +1,62 @@
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.constants import skills
+from app.db import database
+from app.models import users_table, user_skills_table, user_skill_history_table
+from app.services.skill_progress import rollup_upsert
+
+
+async def fetch_last_skill_scores(user_email: str) -> dict[str, float]:
+    query = user_skills_table.select().where(
+        user_skills_table.c.user_email == user_email
+    )
+    rows = await database.fetch_all(query)
+    last_skill_scores = {row["skill_name"]: row["score"] for row in rows} if rows else {}
+    # Initialize missing skills with 0
+    for skill in skills:
+        last_skill_scores.setdefault(skill, 0.0)
+    return last_skill_scores
+
+
+async def save_skill_scores(user_email: str, updated_skill_scores: dict[str, float]):
+    """
+    Persist one answer's skill scores: a single multi-row history insert and
+    a single multi-row snapshot upsert, plus the day/week rollup upsert, in one
+    transaction so the tables never drift apart. The user row is share-locked so
+    the write waits out a skills re-scoring rebuild of the same user.
+    """
+    if not updated_skill_scores:
+        return
+
+    now = datetime.utcnow()
+
+    history_rows = [
+        {"user_email": user_email, "skill_name": skill, "score": score, "timestamp": now}
+        for skill, score in updated_skill_scores.items()
+    ]
+    snapshot_rows = [
+        {"user_email": user_email, "skill_name": skill, "score": score, "updated_at": now}
+        for skill, score in updated_skill_scores.items()
+    ]
+
+    upsert = pg_insert(user_skills_table).values(snapshot_rows)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=["user_email", "skill_name"],
+        set_={
+            "score": upsert.excluded.score,
+            "updated_at": upsert.excluded.updated_at
+        }
+    )
+
+    async with database.transaction():
+        # SQLite has no row locks (and a plain read here would block its upgrade to a write lock)
+        if database.url.scheme.startswith("postgres"):
+            await database.fetch_val(
+                select(users_table.c.id).where(users_table.c.email == user_email).with_for_update(read=True)
+            )
+        await database.execute(user_skill_history_table.insert().values(history_rows))
+        await database.execute(upsert)
+        await database.execute(rollup_upsert(user_email, updated_skill_scores, now))
@@ -0,0 +1,141 @@
+"""
+Static frontend delivery.
+
+`python -m app.build_static` copies frontend/ into frontend/dist (or
+FRONTEND_DIST) with content-hashed names for scripts and stylesheets
+(app.3f2a9c1e07.js), rewrites the pages to point at them and writes a .gz
+(and a .br when the brotli package is installed) next to every text file.
+
+StaticAssets serves that build: hashed files are cached for a year as
+immutable, pages are revalidated against their ETag, and the precompressed
+variant the browser accepts is sent as-is. Without a build (local
+development) the raw frontend/ is served and revalidated on every load.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+from typing import Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.services.compression import accepted_encodings
+
+BUILD_DIR = "dist"
+# Where the build goes and is served from (default <frontend>/dist); the Docker image keeps it
+# outside the directories docker-compose mounts over
+FRONTEND_DIST = os.getenv("FRONTEND_DIST")
+MANIFEST = "manifest.json"
+FINGERPRINTED_SUFFIXES = (".js", ".css")
+COMPRESSIBLE_SUFFIXES = (".html", ".js", ".css", ".svg", ".json", ".txt")
+# Preferred first
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+_REFERENCE = re.compile(r'(src|href)="([^"]+)"')
+
+
+def _fingerprint(name: str, content: bytes) -> str:
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:10]}{ext}"
+
+
+def _write(path: str, content: bytes, brotli=None):
+    with open(path, "wb") as f:
+        f.write(content)
+    if not path.endswith(COMPRESSIBLE_SUFFIXES):
+        return
+    # mtime=0 keeps builds of the same content byte-identical
+    variants = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(content, quality=11)
+    for suffix, data in variants.items():
+        if len(data) < len(content):
+            with open(path + suffix, "wb") as f:
+                f.write(data)
+
+
+def build_dir(source: str) -> str:
+    return FRONTEND_DIST or os.path.join(source, BUILD_DIR)
+
+
+def build_static(source: str = "frontend", out: Optional[str] = None) -> dict[str, str]:
+    """Build `source` into `out` (default build_dir(source)); returns the manifest (original name -> hashed name)."""
+    try:
+        import brotli
+    except ImportError:  # optional: gzip variants only
+        brotli = None
+
+    out = out or build_dir(source)
+    shutil.rmtree(out, ignore_errors=True)
+    os.makedirs(out)
+    files = sorted(name for name in os.listdir(source) if os.path.isfile(os.path.join(source, name)))
+
+    manifest = {}
+    for name in files:
+        if name.endswith(FINGERPRINTED_SUFFIXES):
+            with open(os.path.join(source, name), "rb") as f:
+                content = f.read()
+            manifest[name] = _fingerprint(name, content)
+            _write(os.path.join(out, manifest[name]), content, brotli)
+
+    for name in files:
+        if name.endswith(FINGERPRINTED_SUFFIXES):
+            continue
+        with open(os.path.join(source, name), "rb") as f:
+            content = f.read()
+        if name.endswith(".html"):
+            page = _REFERENCE.sub(lambda m: f'{m[1]}="{manifest.get(m[2], m[2])}"', content.decode("utf-8"))
+            content = page.encode("utf-8")
+        _write(os.path.join(out, name), content, brotli)
+
+    with open(os.path.join(out, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+class StaticAssets(StaticFiles):
+    """StaticFiles over the fingerprinted build (when there is one), with caching headers and precompression."""
+
+    def __init__(self, directory: str, **kwargs):
+        manifest_path = os.path.join(build_dir(directory), MANIFEST)
+        self.fingerprinted = set()
+        if os.path.isfile(manifest_path):
+            with open(manifest_path) as f:
+                self.fingerprinted = set(json.load(f).values())
+            directory = build_dir(directory)
+        super().__init__(directory=directory, **kwargs)
+
+    def file_response(self, full_path, stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        name = os.path.basename(full_path)
+        headers = {"Cache-Control": IMMUTABLE if name in self.fingerprinted else REVALIDATE}
+        path, media_type = full_path, None
+
+        if name.endswith(COMPRESSIBLE_SUFFIXES):
+            headers["Vary"] = "Accept-Encoding"
+            accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+            for encoding, suffix in ENCODINGS:
+                if encoding not in accepted:
+                    continue
+                try:
+                    variant_stat = os.stat(f"{full_path}{suffix}")
+                except FileNotFoundError:
+                    continue
+                # Each variant has its own ETag (FileResponse derives it from the file it sends)
+                path, stat_result = f"{full_path}{suffix}", variant_stat
+                media_type = mimetypes.guess_type(name)[0] or "text/plain"
+                headers["Content-Encoding"] = encoding
+                break
+
+        response = FileResponse(path, status_code=status_code, stat_result=stat_result, headers=headers, media_type=media_type)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,67 @@
+"""
+Startup warm-up and readiness for /healthz.
+
+The slow-to-import optional subsystems (OpenAI SDK, numpy, passlib) are not
+imported with the app. Once the server is up they load in a worker thread and
+the LLM client is built, so the first request that needs them doesn't pay for
+it. Each startup step reports in here; the worker is ready when all are done.
+"""
+import asyncio
+import importlib
+import logging
+import time
+from typing import Optional
+
+from app.services.llm_client import get_client
+
+logger = logging.getLogger("uvicorn")
+
+WARM_IMPORTS = ("openai", "numpy", "passlib.handlers.bcrypt")
+
+
+class Readiness:
+    def __init__(self):
+        self._steps: dict[str, bool] = {}
+        self._started = time.monotonic()
+        self.ready_after: Optional[float] = None
+
+    def expect(self, *steps: str):
+        for step in steps:
+            self._steps.setdefault(step, False)
+
+    def done(self, step: str):
+        self._steps[step] = True
+        if self.ready and self.ready_after is None:
+            self.ready_after = time.monotonic() - self._started
+            logger.info("Ready after %.2fs", self.ready_after)
+
+    @property
+    def ready(self) -> bool:
+        return all(self._steps.values())
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "steps": dict(self._steps),
+            "ready_after_seconds": round(self.ready_after, 3) if self.ready_after is not None else None,
+        }
+
+
+readiness = Readiness()
+
+
+def _import_all():
+    for name in WARM_IMPORTS:
+        importlib.import_module(name)
+
+
+async def warm_up():
+    """Import the deferred subsystems off the event loop, then build the LLM client."""
+    try:
+        await asyncio.to_thread(_import_all)
+        readiness.done("imports")
+        get_client()
+        readiness.done("llm_client")
+    except Exception:
+        # Stay "not ready" rather than serving requests that will fail
+        logger.exception("Startup warm-up failed")
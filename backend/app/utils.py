@@ -1,17 +1,16 @@
-from openai import OpenAI
 from datetime import datetime
 from zoneinfo import ZoneInfo
-from app.models import SessionData, Interaction, sessions_table, interactions_table
+from app.models import SessionData, Interaction, sessions_table, interactions_table, session_summaries_table
 from app.db import database
 from app.constants import skills
+from app.services.llm_client import chat_completion, stream_chat_completion
+from app.services.session_summaries import summary_values, record_question
 from typing import Optional
 import json
 import uuid
 
 import re
 
-client = OpenAI()
-
 # In-memory session store
 sessions = {}
 
@@ -28,84 +27,120 @@ def log_interaction(session_id: str, question: str, answer: str = None):
         sessions[session_id] = SessionData(session_id=session_id, interactions=[])
     sessions[session_id].interactions.append(interaction)
 
+def build_question_messages(
+    role: str,
+    experience: str,
+    tech_stack: str,
+    difficulty: str,
+    last_answer: str = None,
+    avoid: Optional[list[str]] = None
+) -> list[dict]:
+    messages = [
+        {
+            "role": "system",
+            "content": (
+                f"You are a professional technical interviewer. "
+                f"Generate a {difficulty} interview question for a {role} "
+                f"with {experience} of experience using {tech_stack}."
+            )
+        }
+    ]
+
+    if last_answer:
+        messages.append({
+            "role": "user",
+            "content": (
+                f"The candidate just gave this answer: {last_answer}. "
+                f"Please ask a follow-up question related to it, but not repeating the last one."
+            )
+        })
+    else:
+        messages.append({
+            "role": "user",
+            "content": (
+                f"Please ask a {difficulty} interview question for a {role} with {experience} "
+                f"experience using {tech_stack}."
+            )
+        })
+
+    # Questions rejected as near-duplicates of ones the candidate already had
+    if avoid:
+        listed = "\n".join(f"- {question}" for question in avoid)
+        messages.append({
+            "role": "user",
+            "content": (
+                f"The candidate has already been asked these, so ask about something clearly different:\n{listed}"
+            )
+        })
+    return messages
+
 async def generate_interview_question(
     role: str,
     experience: str,
     tech_stack: str,
     difficulty: str,
     last_answer: str = None,
-    model: str = "gpt-3.5-turbo"
+    model: str = "gpt-3.5-turbo",
+    avoid: Optional[list[str]] = None
 ) -> str:
-    try:
-        messages = [
-            {
-                "role": "system",
-                "content": (
-                    f"You are a professional technical interviewer. "
-                    f"Generate a {difficulty} interview question for a {role} "
-                    f"with {experience} of experience using {tech_stack}."
-                )
-            }
-        ]
+    # Failures raise LLMError (mapped to 502/503/429), so no error text is ever stored
+    messages = build_question_messages(role, experience, tech_stack, difficulty, last_answer, avoid)
+    return await chat_completion(messages, model=model, stage="generate_question")
 
-        if last_answer:
-            messages.append({
-                "role": "user",
-                "content": (
-                    f"The candidate just gave this answer: {last_answer}. "
-                    f"Please ask a follow-up question related to it, but not repeating the last one."
-                )
-            })
-        else:
-            messages.append({
-                "role": "user",
-                "content": (
-                    f"Please ask a {difficulty} interview question for a {role} with {experience} "
-                    f"experience using {tech_stack}."
-                )
-            })
-
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages
-        )
+def stream_interview_question(
+    role: str,
+    experience: str,
+    tech_stack: str,
+    difficulty: str,
+    last_answer: str = None,
+    model: str = "gpt-3.5-turbo",
+    avoid: Optional[list[str]] = None
+):
+    messages = build_question_messages(role, experience, tech_stack, difficulty, last_answer, avoid)
+    return stream_chat_completion(messages, model=model, stage="generate_question")
 
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        return f"Error generating question: {e}"
+def build_feedback_messages(question: str, answer: str) -> list[dict]:
+    return [
+        {
+            "role": "system",
+            "content": "You are an expert technical interviewer."
+        },
+        {
+            "role": "user",
+            "content": (
+                f"Question: {question}\n"
+                f"Answer: {answer}\n"
+                "Please evaluate the answer, give constructive feedback, and rate it from 1 (poor) to 10 (excellent). "
+                "Respond in the format:\nFeedback: <text>\nScore: <number>"
+            )
+        }
+    ]
 
-def generate_feedback(question: str, answer: str, model: str = "gpt-3.5-turbo") -> tuple[str, int]:
-    try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert technical interviewer."
-                },
-                {
-                    "role": "user",
-                    "content": (
-                        f"Question: {question}\n"
-                        f"Answer: {answer}\n"
-                        "Please evaluate the answer, give constructive feedback, and rate it from 1 (poor) to 10 (excellent). "
-                        "Respond in the format:\nFeedback: <text>\nScore: <number>"
-                    )
-                }
-            ]
-        )
-        content = response.choices[0].message.content.strip()
+def parse_feedback(content: str) -> tuple[str, int]:
+    feedback_match = re.search(r"Feedback:\s*(.*)", content, re.IGNORECASE)
+    feedback = feedback_match.group(1).strip() if feedback_match else "No feedback found."
 
-        feedback_match = re.search(r"Feedback:\s*(.*)", content, re.IGNORECASE)
-        feedback = feedback_match.group(1).strip() if feedback_match else "No feedback found."
+    score_match = re.search(r"Score:\s*(\d+)", content, re.IGNORECASE)
+    score = int(score_match.group(1)) if score_match else 0
 
-        score_match = re.search(r"Score:\s*(\d+)", content, re.IGNORECASE)
-        score = int(score_match.group(1)) if score_match else 0
+    return feedback, score
 
-        return feedback, score
+async def generate_feedback(
+    question: str,
+    answer: str,
+    model: str = "gpt-3.5-turbo",
+    cache: Optional[bool] = True
+) -> tuple[str, int]:
+    # Cached: retries and double-submits send the same (question, answer)
+    content = await chat_completion(
+        build_feedback_messages(question, answer), model=model, stage="generate_feedback", cache=cache
+    )
+    return parse_feedback(content)
 
-    except Exception as e:
-        return f"Feedback error: {e}", 0
+def stream_feedback(question: str, answer: str, model: str = "gpt-3.5-turbo"):
+    return stream_chat_completion(
+        build_feedback_messages(question, answer), model=model, stage="generate_feedback", cache=True
+    )
 
 async def create_session(session_id: str, user_email: Optional[str] = None):
     jst_now = datetime.now(ZoneInfo("Asia/Tokyo"))
@@ -114,24 +149,28 @@ async def create_session(session_id: str, user_email: Optional[str] = None):
         user_email=user_email,
         created_at=jst_now
     )
-    await database.execute(query)
+    async with database.transaction():
+        await database.execute(query)
+        await database.execute(session_summaries_table.insert().values(
+            summary_values(session_id, user_email, jst_now)
+        ))
 
-async def log_interaction(session_id: str, question: str, answer: str = None):
+async def log_interaction(session_id: str, question: str, answer: str = None) -> int:
+    """Insert an interaction and return its id."""
+    now = datetime.utcnow()
     query = interactions_table.insert().values(
         session_id=session_id,
         question=question,
         answer=answer,
-        timestamp=datetime.utcnow()
-    )
-    await database.execute(query)
-
-async def generate_advice(interactions: list[dict], model: str = "gpt-3.5-turbo") -> str:
-    from openai import OpenAI
-    client = OpenAI()
-
-    if not interactions:
-        return "No interaction history available for advice."
+        timestamp=now,
+        answered_at=now if answer is not None else None
+    ).returning(interactions_table.c.id)
+    async with database.transaction():
+        interaction_id = await database.execute(query)
+        await record_question(session_id, now)
+    return interaction_id
 
+def format_interactions(interactions: list[dict]) -> str:
     history_text = ""
     for i in interactions:
         history_text += (
@@ -139,41 +178,77 @@ async def generate_advice(interactions: list[dict], model: str = "gpt-3.5-turbo"
             f"Answer: {i['answer'] or '(no answer)'}\n"
             f"Feedback: {i['feedback'] or '(no feedback)'}\n"
         )
+    return history_text
 
-    try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a professional technical interview coach. "
-                        "Analyze the candidate’s interview history and give short advice about each of their weaknesses "
-                        "and how they can improve for their target role."
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": (
-                        f"Here is the candidate’s interview history:\n{history_text}\n\n"
-                        "Based on this, what are their weaknesses and how can they improve?"
-                    )
-                }
-            ]
-        )
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        return f"Error generating advice: {e}"
+async def summarize_history(
+    previous_summary: Optional[str],
+    interactions: list[dict],
+    max_words: int = 300,
+    model: str = "gpt-3.5-turbo"
+) -> str:
+    """
+    Fold new interactions into the candidate's rolling history summary.
+    Errors are raised (not returned as text) so they never get stored as a summary.
+    """
+    return await chat_completion(
+        model=model,
+        stage="summarize_history",
+        messages=[
+            {
+                "role": "system",
+                "content": (
+                    "You are a professional technical interview coach keeping notes on a candidate. "
+                    f"Maintain a concise summary (at most {max_words} words) of their strengths, "
+                    "weaknesses and recurring mistakes across all interviews."
+                )
+            },
+            {
+                "role": "user",
+                "content": (
+                    f"Current summary:\n{previous_summary or '(none yet)'}\n\n"
+                    f"New interview history:\n{format_interactions(interactions)}\n\n"
+                    "Return the updated summary only."
+                )
+            }
+        ]
+    )
+
+def build_advice_messages(history_summary: str) -> list[dict]:
+    return [
+        {
+            "role": "system",
+            "content": (
+                "You are a professional technical interview coach. "
+                "Analyze the candidate’s interview history and give short advice about each of their weaknesses "
+                "and how they can improve for their target role."
+            )
+        },
+        {
+            "role": "user",
+            "content": (
+                f"Here is a summary of the candidate’s interview history:\n{history_summary}\n\n"
+                "Based on this, what are their weaknesses and how can they improve?"
+            )
+        }
+    ]
+
+async def generate_advice(history_summary: str, model: str = "gpt-3.5-turbo") -> str:
+    return await chat_completion(build_advice_messages(history_summary), model=model, stage="generate_advice")
+
+def stream_advice(history_summary: str, model: str = "gpt-3.5-turbo"):
+    return stream_chat_completion(build_advice_messages(history_summary), model=model, stage="generate_advice")
 
 async def extract_skill_scores(
     answer: str,
     last_skill_scores: dict[str, float],
-    model: str = "gpt-4o-mini"
+    model: str = "gpt-4o-mini",
+    cache: Optional[bool] = None
 ) -> dict[str, float]:
     """
     Use the OpenAI API to extract scores for each skill based on the given answer
     and previous skill scores.
     Returns a dict of skill_name -> updated score (0 to 10).
+    `cache` is passed to chat_completion (default: cached, as the call is deterministic).
     """
     last_scores_json = json.dumps(last_skill_scores)
 
@@ -199,12 +274,7 @@ async def extract_skill_scores(
         }
     ]
 
-    response = client.chat.completions.create(
-        model=model,
-        messages=messages,
-        temperature=0
-    )
-    content = response.choices[0].message.content.strip()
+    content = await chat_completion(messages, model=model, stage="extract_skill_scores", temperature=0, cache=cache)
 
     # Parse JSON safely
     try:
@@ -0,0 +1,159 @@
+"""
+Local stand-in for the OpenAI chat completions API, for offline load tests.
+
+    python -m benchmarks.fake_openai --port 9100 --latency 0.8 --jitter 0.2 --error-rate 0.01
+
+Point the backend at it with OPENAI_BASE_URL=http://127.0.0.1:9100/v1.
+Replies are shaped after the prompts in app/utils.py (feedback/score format,
+skill-score JSON) so the app's parsers behave as in production.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.constants import skills
+
+app = FastAPI()
+settings = {"latency": 0.5, "jitter": 0.1, "error_rate": 0.0, "token_delay": 0.02}
+stats = {"requests": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+# Distinct enough that the question de-duplication index only occasionally rejects one
+QUESTIONS = [
+    "Walk me through how you would design a rate limiter for a public API, "
+    "including the data structures you would use and how it behaves across several instances.",
+    "How would you find and fix a slow PostgreSQL query that only degrades under production load?",
+    "Explain what happens between typing a URL into the browser and the page being rendered.",
+    "Describe a time you had to roll back a deployment. What signals told you something was wrong?",
+    "How do you keep a cache consistent with the database when both are updated concurrently?",
+    "Design a job queue that guarantees each job runs at least once even if workers crash.",
+    "What are the trade-offs between optimistic and pessimistic locking in a busy web application?",
+    "How would you structure tests for a service that depends on an unreliable third-party API?",
+    "Explain how you would shard a users table that has outgrown a single database server.",
+    "How would you debug a memory leak in a long-running Python web server?",
+]
+
+
+def _reply_for(messages: list[dict]) -> str:
+    prompt = " ".join(m.get("content") or "" for m in messages)
+    if "updated skill scores in JSON" in prompt:
+        return json.dumps({skill: round(random.uniform(3, 8), 1) for skill in skills})
+    if "Feedback: <text>" in prompt:
+        return (
+            "Feedback: Clear structure and good use of examples, but the trade-offs of the "
+            f"chosen approach deserve more depth.\nScore: {random.randint(4, 9)}"
+        )
+    if "summary" in prompt.lower():
+        return "Strong fundamentals; tends to skip trade-off discussion and failure modes."
+    return random.choice(QUESTIONS)
+
+
+def _count_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+async def _wait():
+    await asyncio.sleep(max(0.0, random.gauss(settings["latency"], settings["jitter"])))
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats["requests"] += 1
+
+    if random.random() < settings["error_rate"]:
+        stats["errors"] += 1
+        await _wait()
+        return JSONResponse(
+            status_code=random.choice([429, 500, 503]),
+            content={"error": {"message": "injected failure", "type": "server_error"}}
+        )
+
+    content = _reply_for(body.get("messages", []))
+    prompt_tokens = sum(_count_tokens(m.get("content") or "") for m in body.get("messages", []))
+    completion_tokens = _count_tokens(content)
+    stats["prompt_tokens"] += prompt_tokens
+    stats["completion_tokens"] += completion_tokens
+
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+    model = body.get("model", "gpt-3.5-turbo")
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+
+    if not body.get("stream"):
+        await _wait()
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": usage
+        }
+
+    async def chunks():
+        # Latency applies to the first token; the rest trickle in word by word
+        await _wait()
+        words = content.split(" ")
+        for i, word in enumerate(words):
+            delta = {"content": word if i == 0 else " " + word}
+            yield "data: " + json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": None}]
+            }) + "\n\n"
+            await asyncio.sleep(settings["token_delay"])
+        yield "data: " + json.dumps({
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+        }) + "\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(chunks(), media_type="text/event-stream")
+
+
+@app.get("/stats")
+def get_stats():
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.5, help="mean seconds before a reply / first token")
+    parser.add_argument("--jitter", type=float, default=0.1, help="std-dev of the latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 429/5xx")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between streamed tokens")
+    args = parser.parse_args()
+
+    settings.update(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        token_delay=args.token_delay
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Import-time benchmark for the backend app: what every uvicorn worker and
+new replica pays before it can serve. Runs `python -X importtime -c "import
+app.main"` in fresh interpreters and reports the median total and the
+slowest top-level packages. Fails (exit code 1) if the median is over the
+budget or a deferred module (imported on first use / by the startup
+warm-up) is imported with the app.
+
+No database or OpenAI needed:
+    python -m benchmarks.import_time_bench --runs 5 --budget-ms 1000
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+# Must not be imported by `import app.main`; see app/services/warmup.py
+DEFERRED = ("openai", "numpy", "passlib", "zstandard", "langchain")
+
+
+def profile(module: str) -> list[tuple[str, int, int]]:
+    """(module, self_us, cumulative_us) for every import made by `import module`, in a fresh interpreter."""
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(BACKEND_DIR),
+        "SECRET_KEY": os.environ.get("SECRET_KEY", "import-time-bench"),
+    }
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env, capture_output=True, text=True
+    )
+    if result.returncode:
+        # The app mounts ./frontend, so run from the directory the server runs in
+        sys.exit(f"import {module} failed:\n{result.stderr.splitlines()[-1]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1000.0, help="median total import time budget")
+    parser.add_argument("--top", type=int, default=10, help="slowest top-level packages to list")
+    args = parser.parse_args()
+
+    profile(args.module)  # writes .pyc files so every counted run starts from the same cache state
+    totals, by_package = [], defaultdict(list)
+    for _ in range(args.runs):
+        rows = profile(args.module)
+        totals.append(next(cumulative for name, _, cumulative in rows if name == args.module) / 1000)
+        package_ms = defaultdict(float)
+        for name, self_us, _ in rows:
+            package_ms[name.split(".")[0]] += self_us / 1000
+        for package, ms in package_ms.items():
+            by_package[package].append(ms)
+    imported = {name for name, _, _ in rows}
+
+    total = statistics.median(totals)
+    print(f"import {args.module}: median {total:.0f} ms over {args.runs} runs (min {min(totals):.0f}, max {max(totals):.0f})")
+    slowest = sorted(by_package.items(), key=lambda item: -statistics.median(item[1]))[:args.top]
+    for package, samples in slowest:
+        print(f"  {package:<24} {statistics.median(samples):7.1f} ms")
+
+    failed = False
+    eager = sorted(m for m in DEFERRED if any(name == m or name.startswith(m + ".") for name in imported))
+    if eager:
+        print(f"FAIL imported at startup but meant to be deferred: {', '.join(eager)}")
+        failed = True
+    if total > args.budget_ms:
+        print(f"FAIL median over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+The backend app with per-endpoint DB query counting, for load tests only.
+
+    uvicorn benchmarks.instrumented_app:app
+
+Counts statements sent through `app.db.database` per route and exposes
+them on GET /__bench__/db (reset with DELETE /__bench__/db). WebSocket
+routes are counted per received message.
+"""
+from collections import defaultdict
+from contextvars import ContextVar
+
+from app.db import database
+from app.main import app as backend_app
+
+_current = ContextVar("bench_request", default=None)
+db_queries = defaultdict(int)
+requests = defaultdict(int)
+
+
+def _wrap(name: str):
+    original = getattr(database, name)
+
+    async def wrapped(*args, **kwargs):
+        holder = _current.get()
+        if holder is not None:
+            holder["queries"] += 1
+        return await original(*args, **kwargs)
+
+    setattr(database, name, wrapped)
+
+
+for _name in ("execute", "execute_many", "fetch_one", "fetch_all", "fetch_val"):
+    _wrap(_name)
+
+
+@backend_app.get("/__bench__/db")
+def get_db_counts():
+    return {
+        route: {"requests": requests[route], "queries": db_queries[route]}
+        for route in requests
+    }
+
+
+@backend_app.delete("/__bench__/db")
+def reset_db_counts():
+    db_queries.clear()
+    requests.clear()
+    return {"reset": True}
+
+
+async def _websocket(scope, receive, send):
+    holder = {"queries": 0}
+    messages = 0
+
+    async def counting_receive():
+        nonlocal messages
+        message = await receive()
+        if message["type"] == "websocket.receive":
+            messages += 1
+        return message
+
+    token = _current.set(holder)
+    try:
+        await backend_app(scope, counting_receive, send)
+    finally:
+        _current.reset(token)
+        key = f"WS {scope['path']} (per message)"
+        requests[key] += messages
+        db_queries[key] += holder["queries"]
+
+
+async def app(scope, receive, send):
+    # Pure ASGI wrapper so queries made while streaming a response are counted too
+    if scope["type"] == "websocket":
+        return await _websocket(scope, receive, send)
+    if scope["type"] != "http":
+        return await backend_app(scope, receive, send)
+
+    holder = {"queries": 0}
+    token = _current.set(holder)
+    try:
+        await backend_app(scope, receive, send)
+    finally:
+        _current.reset(token)
+        route = scope.get("route")
+        key = f"{scope['method']} {route.path if route else scope['path']}"
+        if not key.startswith(("GET /__bench__", "DELETE /__bench__")):
+            requests[key] += 1
+            db_queries[key] += holder["queries"]
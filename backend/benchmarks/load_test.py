@@ -0,0 +1,259 @@
+"""
+Offline load test: starts the fake OpenAI server and the backend (with DB
+query counting), then drives register -> login -> question -> feedback ->
+advice flows at the given concurrency and reports latency percentiles,
+throughput and DB queries per endpoint.
+
+Run from the repository root (the backend serves ./frontend):
+    PYTHONPATH=backend python -m benchmarks.load_test --users 50 --concurrency 10
+
+Uses a throwaway SQLite database by default (needs `pip install aiosqlite`);
+pass --database-url postgresql://... to test against Postgres (schema is
+migrated first, test users are left behind).
+
+--ws runs the interview over the /ws/interview WebSocket instead (needs
+`websockets`). Every mode reports "turn": answer -> feedback -> next question.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from typing import Optional
+
+import httpx
+
+ANSWER = (
+    "I would use a token bucket per API key stored in Redis, refilled lazily on each request, "
+    "with a Lua script so the check-and-decrement is atomic across instances."
+)
+
+
+def percentile(values: list, pct: float) -> float:
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(pct / 100 * len(values))) - 1))
+    return values[index]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, name: str, start: float, ok: bool):
+        self.latencies[name].append((time.perf_counter() - start) * 1000)
+        if not ok:
+            self.errors[name] += 1
+
+    async def call(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            res = await client.request(method, url, **kwargs)
+            if res.headers.get("content-type", "").startswith("text/event-stream"):
+                await res.aread()
+            ok = res.status_code < 400
+        except httpx.HTTPError:
+            res, ok = None, False
+        self.record(name, start, ok)
+        return res
+
+
+async def user_flow(base_url: str, recorder: Recorder, turns: int, stream: bool):
+    email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+    password = "load-test-password"
+    suffix = "/stream" if stream else ""
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        await recorder.call(client, "register", "POST", "/auth/register", json={"email": email, "password": password})
+        await recorder.call(client, "login", "POST", "/auth/login", json={"email": email, "password": password})
+
+        profile = {
+            "role": "Backend Engineer",
+            "experience": "2–3 years",
+            "tech_stack": "Python, PostgreSQL",
+            "difficulty": "medium"
+        }
+        res = await recorder.call(client, "question", "POST", "/interview/question", json=profile)
+        if res is None or res.status_code >= 400:
+            return
+        session_id = res.json()["session_id"]
+
+        for _ in range(turns):
+            start = time.perf_counter()
+            feedback = await recorder.call(
+                client, "feedback", "POST", f"/interview/feedback{suffix}",
+                json={"session_id": session_id, "answer": ANSWER}
+            )
+            question = await recorder.call(
+                client, "question", "POST", f"/interview/question{suffix}",
+                json={**profile, "session_id": session_id}
+            )
+            recorder.record("turn", start, all(r is not None and r.status_code < 400 for r in (feedback, question)))
+
+        await recorder.call(client, "session_log", "GET", f"/session/{session_id}")
+        await recorder.call(client, "session_list", "GET", "/user/session")
+        await recorder.call(client, "advice", "POST", f"/interview/advice{suffix}")
+
+
+async def ws_until(ws, event_type: str) -> Optional[dict]:
+    """Read events until `event_type` (returned) or an error event (None)."""
+    while True:
+        event = json.loads(await ws.recv())
+        if event["type"] == event_type:
+            return event
+        if event["type"] == "error":
+            return None
+
+
+async def ws_user_flow(base_url: str, recorder: Recorder, turns: int):
+    from websockets.asyncio.client import connect
+
+    email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+    password = "load-test-password"
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        await recorder.call(client, "register", "POST", "/auth/register", json={"email": email, "password": password})
+        await recorder.call(client, "login", "POST", "/auth/login", json={"email": email, "password": password})
+        token = client.cookies.get("interview_auth")
+
+        profile = {
+            "role": "Backend Engineer",
+            "experience": "2–3 years",
+            "tech_stack": "Python, PostgreSQL",
+            "difficulty": "medium"
+        }
+        url = base_url.replace("http", "ws", 1) + "/ws/interview"
+        async with connect(url, additional_headers={"Cookie": f"interview_auth={token}"}) as ws:
+            start = time.perf_counter()
+            await ws.send(json.dumps({"type": "start", **profile}))
+            question = await ws_until(ws, "question")
+            recorder.record("question", start, question is not None)
+            if question is None:
+                return
+            session_id = question["session_id"]
+
+            for _ in range(turns):
+                start = time.perf_counter()
+                await ws.send(json.dumps({"type": "answer", "answer": ANSWER, "next": True}))
+                recorder.record("turn", start, await ws_until(ws, "question") is not None)
+
+        await recorder.call(client, "session_log", "GET", f"/session/{session_id}")
+        await recorder.call(client, "session_list", "GET", "/user/session")
+        await recorder.call(client, "advice", "POST", "/interview/advice")
+
+
+async def wait_until_up(url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+
+async def drive(args, base_url: str) -> tuple[Recorder, float, dict]:
+    recorder = Recorder()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one_user():
+        async with semaphore:
+            if args.ws:
+                await ws_user_flow(base_url, recorder, args.turns)
+            else:
+                await user_flow(base_url, recorder, args.turns, args.stream)
+
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        await client.delete("/__bench__/db")
+        start = time.perf_counter()
+        await asyncio.gather(*(one_user() for _ in range(args.users)))
+        elapsed = time.perf_counter() - start
+        db_counts = (await client.get("/__bench__/db")).json()
+
+    return recorder, elapsed, db_counts
+
+
+def report(recorder: Recorder, elapsed: float, db_counts: dict):
+    print(f"\n{'endpoint':<14} {'n':>6} {'err':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8}")
+    for name, values in recorder.latencies.items():
+        print(
+            f"{name:<14} {len(values):>6} {recorder.errors[name]:>5} "
+            f"{statistics.median(values):>9.1f} {percentile(values, 95):>9.1f} "
+            f"{percentile(values, 99):>9.1f} {len(values) / elapsed:>8.1f}"
+        )
+    total = sum(len(v) for v in recorder.latencies.values())
+    print(f"\n{total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s)")
+
+    print(f"\n{'route':<44} {'requests':>9} {'queries/request':>16}")
+    for route, counts in sorted(db_counts.items()):
+        per_request = counts["queries"] / counts["requests"] if counts["requests"] else 0
+        print(f"{route:<44} {counts['requests']:>9} {per_request:>16.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20, help="virtual users (one full flow each)")
+    parser.add_argument("--concurrency", type=int, default=5, help="users running at the same time")
+    parser.add_argument("--turns", type=int, default=3, help="answer/follow-up rounds per user")
+    parser.add_argument("--stream", action="store_true", help="use the SSE endpoints after the first question")
+    parser.add_argument("--ws", action="store_true", help="run the interview over the /ws/interview WebSocket")
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--llm-jitter", type=float, default=0.1)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-token-delay", type=float, default=0.02)
+    parser.add_argument("--app-port", type=int, default=8765)
+    parser.add_argument("--llm-port", type=int, default=9100)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="interview-load-")
+    database_url = args.database_url or f"sqlite:///{tmpdir}/load.db"
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "OPENAI_API_KEY": "fake-key",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{args.llm_port}/v1",
+        "SECRET_KEY": os.environ.get("SECRET_KEY", "load-test-secret"),
+        "BCRYPT_ROUNDS": os.environ.get("BCRYPT_ROUNDS", "4"),
+    }
+
+    subprocess.run([sys.executable, "-m", "app.migrate"], env=env, check=True, stdout=subprocess.DEVNULL)
+
+    llm = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.fake_openai",
+        "--port", str(args.llm_port),
+        "--latency", str(args.llm_latency),
+        "--jitter", str(args.llm_jitter),
+        "--error-rate", str(args.llm_error_rate),
+        "--token-delay", str(args.llm_token_delay),
+    ], env=env)
+    backend = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "benchmarks.instrumented_app:app",
+        "--port", str(args.app_port), "--log-level", "warning",
+    ], env=env)
+
+    base_url = f"http://127.0.0.1:{args.app_port}"
+    try:
+        asyncio.run(wait_until_up(f"http://127.0.0.1:{args.llm_port}/stats"))
+        asyncio.run(wait_until_up(base_url + "/"))
+        recorder, elapsed, db_counts = asyncio.run(drive(args, base_url))
+        report(recorder, elapsed, db_counts)
+    finally:
+        backend.terminate()
+        llm.terminate()
+        backend.wait()
+        llm.wait()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Login-burst benchmark: fire a burst of concurrent logins and measure the
+latency of a cheap endpoint (GET /) while the burst is in flight.
+With bcrypt on the event loop the probe stalls for the whole burst; with
+hashing offloaded it should stay close to its idle latency.
+
+Runs against a live server:
+    python -m benchmarks.login_burst_bench --base-url http://localhost:8000 --logins 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+async def probe(client: httpx.AsyncClient, stop: asyncio.Event, latencies: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/")
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.01)
+
+
+def summarize(name: str, latencies: list):
+    latencies = sorted(latencies)
+    if not latencies:
+        print(f"{name:<22} no samples")
+        return
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    print(
+        f"{name:<22} n={len(latencies):<5} p50={statistics.median(latencies):8.1f} ms "
+        f"p95={p95:8.1f} ms max={latencies[-1]:8.1f} ms"
+    )
+
+
+async def main(base_url: str, logins: int):
+    email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+    password = "bench-password"
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        await client.post("/auth/register", json={"email": email, "password": password})
+
+        # Idle baseline
+        idle, stop = [], asyncio.Event()
+        task = asyncio.create_task(probe(client, stop, idle))
+        await asyncio.sleep(2)
+        stop.set()
+        await task
+
+        # Same probe during the login burst
+        during, login_latencies, stop = [], [], asyncio.Event()
+        task = asyncio.create_task(probe(client, stop, during))
+
+        async def login():
+            start = time.perf_counter()
+            res = await client.post("/auth/login", json={"email": email, "password": password})
+            res.raise_for_status()
+            login_latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        burst_seconds = time.perf_counter() - start
+        stop.set()
+        await task
+
+    summarize("GET / (idle)", idle)
+    summarize("GET / (during burst)", during)
+    summarize("POST /auth/login", login_latencies)
+    print(f"{logins} logins in {burst_seconds:.2f}s ({logins / burst_seconds:.1f} logins/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--logins", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.base_url, args.logins))
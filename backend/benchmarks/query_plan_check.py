@@ -0,0 +1,109 @@
+"""
+Query-plan check for the hot lookups. Fails (exit code 1) if any of them
+cannot be answered without a sequential scan of its table.
+
+Sequential scans are disabled for the check so small dev databases, where
+the planner would legitimately prefer a seq scan, still show whether a
+usable index exists. Needs Postgres with migrations applied:
+    python -m benchmarks.query_plan_check
+"""
+import sys
+
+from datetime import datetime
+
+from sqlalchemy import text, tuple_
+from sqlalchemy.dialects import postgresql
+
+from app.db import get_engine
+from app.models import (
+    interactions_table,
+    sessions_table,
+    session_summaries_table,
+    user_skill_history_table,
+    user_skill_rollups_table
+)
+
+SAMPLE_SESSION = "00000000-0000-0000-0000-000000000000"
+SAMPLE_EMAIL = "someone@example.com"
+SAMPLE_TIMESTAMP = datetime(2024, 1, 1)
+
+# (name, table that must not be seq-scanned, query)
+HOT_QUERIES = [
+    (
+        "last interaction of a session",
+        "interactions",
+        interactions_table.select()
+        .where(interactions_table.c.session_id == SAMPLE_SESSION)
+        .order_by(interactions_table.c.timestamp.desc())
+        .limit(1),
+    ),
+    (
+        "session log page (keyset)",
+        "interactions",
+        interactions_table.select()
+        .where(interactions_table.c.session_id == SAMPLE_SESSION)
+        .where(tuple_(interactions_table.c.timestamp, interactions_table.c.id) > tuple_(SAMPLE_TIMESTAMP, 1000))
+        .order_by(interactions_table.c.timestamp.asc(), interactions_table.c.id.asc())
+        .limit(21),
+    ),
+    (
+        "sessions of a user (keyset)",
+        "sessions",
+        sessions_table.select()
+        .where(sessions_table.c.user_email == SAMPLE_EMAIL)
+        .where(tuple_(sessions_table.c.created_at, sessions_table.c.id) < tuple_(SAMPLE_TIMESTAMP, SAMPLE_SESSION))
+        .order_by(sessions_table.c.created_at.desc(), sessions_table.c.id.desc())
+        .limit(21),
+    ),
+    (
+        "session summaries of a user (keyset)",
+        "session_summaries",
+        session_summaries_table.select()
+        .where(session_summaries_table.c.user_email == SAMPLE_EMAIL)
+        .where(
+            tuple_(session_summaries_table.c.created_at, session_summaries_table.c.session_id)
+            < tuple_(SAMPLE_TIMESTAMP, SAMPLE_SESSION)
+        )
+        .order_by(session_summaries_table.c.created_at.desc(), session_summaries_table.c.session_id.desc())
+        .limit(21),
+    ),
+    (
+        "skill history of a user",
+        "user_skill_history",
+        user_skill_history_table.select()
+        .where(user_skill_history_table.c.user_email == SAMPLE_EMAIL)
+        .order_by(user_skill_history_table.c.skill_name, user_skill_history_table.c.timestamp),
+    ),
+    (
+        "skill progress of a user",
+        "user_skill_rollups",
+        user_skill_rollups_table.select()
+        .where(user_skill_rollups_table.c.user_email == SAMPLE_EMAIL)
+        .where(user_skill_rollups_table.c.period == "day")
+        .order_by(user_skill_rollups_table.c.skill_name, user_skill_rollups_table.c.bucket_start),
+    ),
+]
+
+
+def explain(conn, query) -> str:
+    sql = query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    rows = conn.execute(text(f"EXPLAIN {sql}")).scalars()
+    return "\n".join(rows)
+
+
+def main() -> int:
+    failures = 0
+    with get_engine().connect() as conn:
+        conn.execute(text("SET enable_seqscan = off"))
+        for name, table, query in HOT_QUERIES:
+            plan = explain(conn, query)
+            ok = f"Seq Scan on {table}" not in plan
+            failures += not ok
+            print(f"{'OK  ' if ok else 'FAIL'} {name}")
+            if not ok:
+                print("     " + plan.replace("\n", "\n     "))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+Question de-duplication benchmark: index N synthetic past questions for one
+user, then time near-duplicate lookups (MinHash signature + vectorized
+comparison against the whole history). Fails (exit code 1) if the p99 lookup
+is over the budget, or if a known pair is judged wrongly: different
+questions built on the same template, or rewordings of the same question.
+
+No database or OpenAI needed:
+    python -m benchmarks.question_dedup_bench --questions 5000 --budget-ms 1
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+
+from app.services.question_dedup import QUESTION_DEDUP_THRESHOLD, UserQuestions, QuestionIndex, minhash
+
+TOPICS = [
+    "rate limiter", "message queue", "database index", "cache invalidation", "load balancer",
+    "consistent hashing", "leader election", "connection pool", "circuit breaker", "CDN",
+    "sharded counter", "feature flag service", "search autocomplete", "URL shortener", "chat service",
+]
+TEMPLATES = [
+    "How would you design a {topic} for a service handling {n} requests per second?",
+    "Explain the trade-offs of using a {topic} when traffic grows to {n} users.",
+    "What can go wrong with a {topic} under {n} concurrent writes, and how would you detect it?",
+    "Walk me through debugging a slow {topic} that serves {n} clients.",
+]
+
+# (past question, new question, should count as a repeat)
+PAIRS = [
+    ("How would you optimize a slow SQL query in PostgreSQL?",
+     "How would you optimize a slow React component render?", False),
+    ("How would you design a rate limiter for a service handling 500 requests per second?",
+     "How would you design a message queue for a service handling 500 requests per second?", False),
+    ("How would you design a rate limiter for a service handling 500 requests per second?",
+     "How do you design a rate limiter for a service handling 500 requests per second?", True),
+    ("What is the difference between a process and a thread?",
+     "Explain the difference between a process and a thread.", True),
+]
+
+
+def check_pairs() -> int:
+    """Print each known pair's estimated similarity; returns how many were judged wrongly."""
+    wrong = 0
+    for past, new, repeat in PAIRS:
+        index = QuestionIndex()
+        user = UserQuestions()
+        user.add(minhash(past))
+        index._users.set("pairs@example.com", user)
+        flagged = index.is_duplicate("pairs@example.com", new)
+        similarity = user.max_similarity(minhash(new))
+        ok = flagged == repeat
+        wrong += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {similarity:.2f} {'repeat  ' if repeat else 'distinct'} {new}")
+    return wrong
+
+
+def synthetic_question(rng: random.Random) -> str:
+    return rng.choice(TEMPLATES).format(topic=rng.choice(TOPICS), n=rng.randint(10, 100000))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=5000, help="past questions in the user's index")
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--budget-ms", type=float, default=1.0, help="p99 lookup budget")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    history = [synthetic_question(rng) for _ in range(args.questions)]
+
+    start = time.perf_counter()
+    user = UserQuestions(capacity=len(history))
+    for question in history:
+        user.add(minhash(question))
+    build_ms = (time.perf_counter() - start) * 1000
+
+    index = QuestionIndex()
+    index._users.set("bench@example.com", user)
+
+    latencies, duplicates = [], 0
+    for i in range(args.lookups):
+        # Half re-asked (slightly reworded) past questions, half fresh ones
+        candidate = rng.choice(history).replace("How would you", "How do you") if i % 2 else synthetic_question(rng)
+        start = time.perf_counter()
+        duplicates += index.is_duplicate("bench@example.com", candidate)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies.sort()
+    p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+    print(f"indexed {args.questions} questions in {build_ms:.0f} ms ({user.signatures[:, :user.count].nbytes / 1024:.0f} KiB)")
+    print(
+        f"lookup p50={statistics.median(latencies):.3f} ms p99={p99:.3f} ms "
+        f"max={latencies[-1]:.3f} ms, {duplicates}/{args.lookups} flagged as duplicates"
+    )
+    print(f"known pairs (threshold {QUESTION_DEDUP_THRESHOLD}):")
+    failed = check_pairs() > 0
+    if p99 > args.budget_ms:
+        print(f"FAIL p99 over the {args.budget_ms} ms budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
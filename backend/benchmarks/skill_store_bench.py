@@ -0,0 +1,123 @@
+"""
+Benchmark skill-score persistence per feedback: the old per-skill loop
+(2 statements x 9 skills) vs the batched transactional skill store.
+Round-trips count statements only; the batched variant also sends BEGIN/COMMIT.
+
+Needs a Postgres with the schema created (DATABASE_URL):
+    python -m benchmarks.skill_store_bench --iterations 50
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.constants import skills
+from app.db import database
+from app.models import users_table, user_skills_table, user_skill_history_table, user_skill_rollups_table
+from app.services.skill_store import save_skill_scores
+
+BENCH_EMAIL = "bench-skill-store@example.com"
+
+
+class RoundTripCounter:
+    """Count statements sent through `database` (execute/fetch_*)."""
+
+    def __init__(self):
+        self.count = 0
+        self._originals = {}
+
+    def __enter__(self):
+        for name in ("execute", "execute_many", "fetch_one", "fetch_all", "fetch_val"):
+            original = getattr(database, name)
+            self._originals[name] = original
+
+            async def wrapped(*args, _original=original, **kwargs):
+                self.count += 1
+                return await _original(*args, **kwargs)
+
+            setattr(database, name, wrapped)
+        return self
+
+    def __exit__(self, *exc):
+        for name, original in self._originals.items():
+            setattr(database, name, original)
+
+
+async def save_skill_scores_legacy(user_email: str, updated_skill_scores: dict[str, float]):
+    # Pre-batching implementation, kept here only for comparison
+    for skill, new_score in updated_skill_scores.items():
+        now = datetime.utcnow()
+        await database.execute(
+            user_skill_history_table.insert().values(
+                user_email=user_email,
+                skill_name=skill,
+                score=new_score,
+                timestamp=now
+            )
+        )
+        stmt = pg_insert(user_skills_table).values(
+            user_email=user_email,
+            skill_name=skill,
+            score=new_score,
+            updated_at=now
+        ).on_conflict_do_update(
+            index_elements=["user_email", "skill_name"],
+            set_={"score": new_score, "updated_at": now}
+        )
+        await database.execute(stmt)
+
+
+async def run(name: str, save, iterations: int) -> dict:
+    latencies = []
+    with RoundTripCounter() as counter:
+        for _ in range(iterations):
+            scores = {skill: round(random.uniform(0, 10), 1) for skill in skills}
+            start = time.perf_counter()
+            await save(BENCH_EMAIL, scores)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies.sort()
+    return {
+        "name": name,
+        "round_trips": counter.count / iterations,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+    }
+
+
+async def main(iterations: int):
+    await database.connect()
+    try:
+        await database.execute(
+            pg_insert(users_table).values(email=BENCH_EMAIL, password="-").on_conflict_do_nothing()
+        )
+        results = [
+            await run("before (per-skill loop)", save_skill_scores_legacy, iterations),
+            await run("after (batched transaction)", save_skill_scores, iterations),
+        ]
+        print(f"{'variant':<30} {'round-trips':>12} {'p50 ms':>8} {'p95 ms':>8}")
+        for r in results:
+            print(f"{r['name']:<30} {r['round_trips']:>12.1f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f}")
+    finally:
+        await database.execute(
+            user_skill_history_table.delete().where(user_skill_history_table.c.user_email == BENCH_EMAIL)
+        )
+        await database.execute(
+            user_skills_table.delete().where(user_skills_table.c.user_email == BENCH_EMAIL)
+        )
+        await database.execute(
+            user_skill_rollups_table.delete().where(user_skill_rollups_table.c.user_email == BENCH_EMAIL)
+        )
+        await database.execute(users_table.delete().where(users_table.c.email == BENCH_EMAIL))
+        await database.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations))
@@ -1,5 +1,90 @@
 let sessionId = null;
 
+// POST a JSON body to a streaming (SSE) endpoint and dispatch its events.
+// handlers: { token(data), done(data), error(data), ...any other event name }
+async function streamEvents(url, body, handlers, headers = {}) {
+  const res = await fetch(url, {
+    method: "POST",
+    headers: { "Content-Type": "application/json", ...headers },
+    credentials: "include",
+    body: JSON.stringify(body),
+  });
+
+  if (!res.ok) {
+    const data = await res.json().catch(() => ({}));
+    if (handlers.error) handlers.error(data);
+    return;
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Events are separated by a blank line
+    let boundary;
+    while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+      const raw = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = "message";
+      let data = "";
+      raw.split("\n").forEach(line => {
+        if (line.startsWith("event: ")) event = line.slice(7);
+        else if (line.startsWith("data: ")) data += line.slice(6);
+      });
+      if (handlers[event]) handlers[event](data ? JSON.parse(data) : null);
+    }
+  }
+}
+
+// The interview runs over one WebSocket (authenticated once per connection);
+// the SSE endpoints are the fallback when it can't be opened.
+let socket = null;
+let socketHandlers = null;
+let currentProfile = null;
+
+function openSocket() {
+  if (socket && socket.readyState === WebSocket.OPEN) return Promise.resolve(false);
+  return new Promise((resolve, reject) => {
+    const scheme = window.location.protocol === "https:" ? "wss" : "ws";
+    const ws = new WebSocket(`${scheme}://${window.location.host}/ws/interview`);
+    ws.onopen = () => { socket = ws; resolve(true); };
+    ws.onerror = () => reject(new Error("WebSocket unavailable"));
+    ws.onmessage = (msg) => {
+      const event = JSON.parse(msg.data);
+      if (socketHandlers && socketHandlers[event.type]) socketHandlers[event.type](event);
+    };
+    ws.onclose = () => {
+      if (socket === ws) socket = null;
+      if (socketHandlers) socketHandlers.error({ detail: "Connection lost, please try again." });
+    };
+  });
+}
+
+// Send one message and dispatch its events to `handlers` until `doneEvent` (passed to handlers.done) or an error.
+// Throws if no socket can be opened.
+async function socketRequest(message, handlers, doneEvent) {
+  const reopened = await openSocket();
+  if (reopened && sessionId && message.type !== "start") {
+    // Reconnected: resume the session before continuing it
+    await socketRequest({ type: "start", ...currentProfile, session_id: sessionId }, {}, "session");
+  }
+  return new Promise((resolve) => {
+    const finish = (handler, ok) => (event) => {
+      socketHandlers = null;
+      if (handler) handler(event);
+      resolve(ok);
+    };
+    socketHandlers = { ...handlers, [doneEvent]: finish(handlers.done, true), error: finish(handlers.error, false) };
+    socket.send(JSON.stringify(message));
+  });
+}
+
 async function startSession() {
   const role = document.getElementById("role").value;
   const experience = document.getElementById("experience").value;
@@ -7,24 +92,16 @@ async function startSession() {
   const difficulty = document.getElementById("difficulty").value;
   const model = document.getElementById("model").value;
 
-  const res = await fetch("http://localhost:8000/interview/question", {
-    method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ role, experience, tech_stack, difficulty, model })
-  });
-
-  const data = await res.json();
-  sessionId = data.session_id;
-
   document.getElementById("session").innerHTML = `
     <div class="card p-4 mb-4 shadow-sm">
-      <p><strong>Question:</strong> ${data.question}</p>
+      <p><strong>Question:</strong> <span id="question-text"></span></p>
       <div class="mb-3">
         <textarea id="answer" class="form-control" rows="4" placeholder="Your answer here..."></textarea>
       </div>
       <button class="btn btn-primary" onclick="submitAnswer()">Submit Answer</button>
     </div>
   `;
+  const questionText = document.getElementById("question-text");
 
   // Clear and reset advice section
   adviceFetched = false;
@@ -38,29 +115,77 @@ async function startSession() {
     toggleBtn.textContent = "Get Advice";
   }
 
+  // Render the question as it is generated
+  currentProfile = { role, experience, tech_stack, difficulty, model };
+  const handlers = {
+    session: (data) => { sessionId = data.session_id; },
+    token: (data) => { questionText.textContent += data.text; },
+    reset: () => { questionText.textContent = ""; },
+    done: (data) => { questionText.textContent = data.question; },
+    error: (data) => { questionText.textContent = data.detail || "Error generating question."; },
+  };
+  try {
+    await socketRequest({ type: "start", ...currentProfile }, handlers, "question");
+  } catch (e) {
+    await streamEvents("/interview/question/stream", currentProfile, handlers);
+  }
+
   // Reload session history
   loadSessionHistory();
 }
 
+let submitting = false;
 async function submitAnswer() {
-  const answer = document.getElementById('answer').value;
+  // Ignore double-clicks while an answer is being graded
+  if (submitting) return;
+  submitting = true;
+  try {
+    await sendAnswer();
+  } finally {
+    submitting = false;
+  }
+}
 
-  const res = await fetch("http://localhost:8000/interview/feedback", {
-    method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ session_id: sessionId, answer }),
-  });
+// The answer being submitted and its Idempotency-Key: retries of the same answer
+// reuse the key (so the server returns the stored result) until it is graded
+let pendingAnswer = null;
 
-  const data = await res.json();
+async function sendAnswer() {
+  const answer = document.getElementById('answer').value;
+  if (!pendingAnswer || pendingAnswer.sessionId !== sessionId || pendingAnswer.answer !== answer) {
+    pendingAnswer = { sessionId, answer, key: crypto.randomUUID() };
+  }
+  const idempotencyKey = pendingAnswer.key;
 
-  document.getElementById('session').innerHTML += `
-    <p><strong>Feedback:</strong> ${data.feedback}</p>
-    <p><strong>Score:</strong> ${data.score}</p>
+  const feedbackElem = document.createElement("div");
+  feedbackElem.innerHTML = `
+    <p><strong>Feedback:</strong> <span class="feedback-text"></span></p>
+    <p><strong>Score:</strong> <span class="score-text"></span></p>
   `;
+  document.getElementById('session').appendChild(feedbackElem);
+  const feedbackText = feedbackElem.querySelector(".feedback-text");
+  const scoreText = feedbackElem.querySelector(".score-text");
 
   // Clear old advice on new answer
   const adviceBox = document.getElementById("advice-box");
   if (adviceBox) adviceBox.innerHTML = "";
+  adviceFetched = false;
+
+  const handlers = {
+    token: (data) => { feedbackText.textContent += data.text; },
+    done: (data) => {
+      if (pendingAnswer && pendingAnswer.key === idempotencyKey) pendingAnswer = null;
+      feedbackText.textContent = data.feedback;
+      scoreText.textContent = data.score;
+    },
+    error: (data) => { feedbackText.textContent = data.detail || "Feedback error."; },
+  };
+  try {
+    await socketRequest({ type: "answer", answer }, handlers, "feedback");
+  } catch (e) {
+    await streamEvents("/interview/feedback/stream",
+      { session_id: sessionId, answer }, handlers, { "Idempotency-Key": idempotencyKey });
+  }
 }
 
 // Handle register form
@@ -70,7 +195,7 @@ if (registerForm) {
     e.preventDefault();
     const email = document.getElementById("email").value;
     const password = document.getElementById("password").value;
-    const res = await fetch("http://localhost:8000/auth/register", {
+    const res = await fetch("/auth/register", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({ email, password }),
@@ -91,7 +216,7 @@ if (loginForm) {
     e.preventDefault();
     const email = document.getElementById("email").value;
     const password = document.getElementById("password").value;
-    const res = await fetch("http://localhost:8000/auth/login", {
+    const res = await fetch("/auth/login", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       credentials: "include",
@@ -173,31 +298,65 @@ async function showUserEmail() {
 // Always call on page load
 showUserEmail();
 
+// Infinite scroll: call loadMore() whenever the sentinel comes into view,
+// until it reports there is nothing left
+function infiniteScroll(container, loadMore) {
+  const sentinel = document.createElement("div");
+  container.appendChild(sentinel);
+
+  let loading = false;
+  const observer = new IntersectionObserver(async (entries) => {
+    if (!entries[0].isIntersecting || loading) return;
+    loading = true;
+    try {
+      const hasMore = await loadMore();
+      if (!hasMore) {
+        observer.disconnect();
+        sentinel.remove();
+      }
+    } catch (error) {
+      console.error(error);
+      observer.disconnect();
+    } finally {
+      loading = false;
+    }
+  });
+  observer.observe(sentinel);
+  return observer;
+}
+
 // Show session history of an user
+let historyObserver = null;
 async function loadSessionHistory() {
-  try {
-    const res = await fetch("/user/session", {
+  let container = document.getElementById("session-history");
+  if (!container) {
+    container = document.createElement("div");
+    container.id = "session-history";
+    container.style.marginTop = "20px";
+    document.body.appendChild(container);
+  }
+
+  if (historyObserver) historyObserver.disconnect();
+  container.innerHTML = "";
+  const list = document.createElement("ul");
+  container.appendChild(list);
+
+  let cursor = null;
+  historyObserver = infiniteScroll(container, async () => {
+    const params = new URLSearchParams({ limit: 20 });
+    if (cursor) params.set("cursor", cursor);
+    const res = await fetch(`/user/session?${params}`, {
       credentials: "include",
     });
     if (!res.ok) throw new Error("Failed to fetch user session history");
 
     const data = await res.json();
 
-    let container = document.getElementById("session-history");
-    if (!container) {
-      container = document.createElement("div");
-      container.id = "session-history";
-      container.style.marginTop = "20px";
-      document.body.appendChild(container);
-    }
-
-    if (data.sessions.length === 0) {
+    if (!cursor && data.sessions.length === 0) {
       container.textContent = "No previous sessions found.";
-      return;
+      return false;
     }
 
-    container.innerHTML = "";
-    const list = document.createElement("ul");
     data.sessions.forEach(session => {
       const li = document.createElement("li");
       const timestamp = session.created_at
@@ -209,14 +368,24 @@ async function loadSessionHistory() {
       link.textContent = `Session on ${timestamp}`;
       link.onclick = () => loadSessionDetail(session.id);
 
+      const details = document.createElement("small");
+      details.className = "text-muted ms-2";
+      const average = session.average_score ?? "N/A";
+      const lastActivity = session.last_activity_at
+        ? new Date(session.last_activity_at).toLocaleString()
+        : "never";
+      details.textContent =
+        `${session.question_count} questions · ${session.answered_count} answered · ` +
+        `avg score ${average} · last activity ${lastActivity}`;
+
       li.appendChild(link);
+      li.appendChild(details);
       list.appendChild(li);
     });
-    container.appendChild(list);
 
-  } catch (error) {
-    console.error(error);
-  }
+    cursor = data.next_cursor;
+    return Boolean(cursor);
+  });
 }
 
 // Call this after confirming user is logged in on index page
@@ -226,24 +395,31 @@ if (window.location.pathname.endsWith("index.html") || window.location.pathname
   });
 }
 
+let detailObserver = null;
 async function loadSessionDetail(sessionId) {
-  try {
-    const res = await fetch(`/session/${sessionId}`, {
+  const container = document.getElementById("session");
+  container.innerHTML = `<h3>Session Detail</h3>`;
+  const list = document.createElement("ol");
+  container.appendChild(list);
+
+  if (detailObserver) detailObserver.disconnect();
+
+  let cursor = null;
+  detailObserver = infiniteScroll(container, async () => {
+    const params = new URLSearchParams({ limit: 20 });
+    if (cursor) params.set("cursor", cursor);
+    const res = await fetch(`/session/${sessionId}?${params}`, {
       credentials: "include",
     });
     if (!res.ok) throw new Error("Failed to fetch session detail");
 
     const data = await res.json();
 
-    const container = document.getElementById("session");
-    container.innerHTML = `<h3>Session Detail</h3>`;
-
-    if (!data.interactions || data.interactions.length === 0) {
+    if (!cursor && (!data.interactions || data.interactions.length === 0)) {
       container.innerHTML += `<p>No interactions found for this session.</p>`;
-      return;
+      return false;
     }
 
-    const list = document.createElement("ol");
     data.interactions.forEach(log => {
       const li = document.createElement("li");
       li.innerHTML = `
@@ -256,11 +432,9 @@ async function loadSessionDetail(sessionId) {
       list.appendChild(li);
     });
 
-    container.appendChild(list);
-
-  } catch (err) {
-    console.error("Error loading session detail:", err);
-  }
+    cursor = data.pagination.next_cursor;
+    return Boolean(cursor);
+  });
 }
 
 let adviceFetched = false;
@@ -270,23 +444,27 @@ async function handleAdviceToggle() {
 
   if (!adviceFetched) {
     try {
-      const res = await fetch("/interview/advice", {
-        method: "POST",
-        credentials: "include",
-        headers: { "Content-Type": "application/json" },
-      });
-
-      const data = await res.json();
+      let adviceText = "";
+      adviceBox.innerHTML = formatAdvice(adviceText);
+      adviceBox.style.display = "block";
+      toggleBtn.textContent = "Hide Advice";
 
-      if (res.ok) {
-        adviceBox.innerHTML = formatAdvice(data.advice);
-        adviceBox.style.display = "block";
-        adviceFetched = true;
-        toggleBtn.textContent = "Hide Advice";
-        adviceBox.scrollIntoView({ behavior: "smooth" });
-      } else {
-        alert(data.detail || "Failed to get advice.");
-      }
+      await streamEvents("/interview/advice/stream", {}, {
+        token: (data) => {
+          adviceText += data.text;
+          adviceBox.innerHTML = formatAdvice(adviceText);
+        },
+        done: (data) => {
+          adviceBox.innerHTML = formatAdvice(data.advice);
+          adviceFetched = true;
+          adviceBox.scrollIntoView({ behavior: "smooth" });
+        },
+        error: (data) => {
+          adviceBox.style.display = "none";
+          toggleBtn.textContent = "Get Advice";
+          alert(data.detail || "Failed to get advice.");
+        },
+      });
     } catch (error) {
       console.error("Error fetching advice:", error);
     }